@@ -4,9 +4,12 @@ from core.plugins.plugin import Plugin
 from core.types import ControllerModule
 from plugins.microservices._core.backend_loader import disable_waypoint_shared_connectors, initialize_channels, initialize_waypoints, load_backends, prepare_channels
 from plugins.microservices._core.consume_executor import ConsumeExecutor
+from plugins.microservices._core.supervisor import ConsumerSupervisor
+from plugins.microservices.redis.cache import stop_invalidators
 from plugins.microservices.redis.engine import RedisEngine
 from plugins.microservices.redis.singleton import RedisEngineSingleton
 from plugins.microservices.security_manager import SecurityManager
+from plugins.microservices.serialization.compression import CompressionPolicy, set_default_compression
 from plugins.microservices.types.channels import ControllerChannel
 from plugins.microservices.types.config import MainConfig
 from plugins.microservices.types.connections import LiveConnections
@@ -35,6 +38,10 @@ class AscenderFrameworkMicroservices(Plugin):
         self.loaded_channels: dict[str, tuple[ControllerChannel, ControllerModule]] = {}
         self.loaded_waypoints: dict[str, "HTTPWaypoint"] = {}
         self.consume_executor = None
+        self.consumer_supervisor = None
+
+        if compression := self.config.get("compression", None):
+            set_default_compression(CompressionPolicy(**compression))
 
     def install(self, application: Application):
         self.application = application
@@ -51,23 +58,32 @@ class AscenderFrameworkMicroservices(Plugin):
         self.active_controllers[name] = instance
 
     async def initialize_connections(self):
-        # Load security manager
+        # Load security manager, before workers are forked so they inherit it
         if internal_policy := self.config.get("internal_privacy", None):
             self.application.service_registry.add_singletone(
                 SecurityManager, SecurityManager(internal_policy["current_service_id"],
                                                  internal_policy["secret_key"],
                                                  internal_policy["token_lifetime"],
                                                  internal_policy["allowed_services"]))
-        
+
+        # Fork consumer workers before any connection is opened, so sockets aren't shared with them
+        if supervisor_config := self.config.get("supervisor", None):
+            self.consumer_supervisor = ConsumerSupervisor(self.config, self.controllers, self.injector,
+                                                          waypoints=self.waypoint_registry.waypoints if self.use_http_waypoints else None,
+                                                          default_processes=supervisor_config["processes"],
+                                                          restart_delay=supervisor_config.get("restart_delay", 1.0),
+                                                          shutdown_timeout=supervisor_config.get("shutdown_timeout", 30.0))
+            self.consumer_supervisor.start()
+
         # Load backends
         self.live_connections = await load_backends(self.connections)
         self.live_connections.select_default(self.config["default_connection"])
         self.application.service_registry.add_singletone(LiveConnections, self.live_connections)
-        self.consume_executor = ConsumeExecutor(live_connections=self.live_connections,
-                                                default_connection=self.config["default_connection"])
+        self.consume_executor = ConsumeExecutor.from_config(self.live_connections, self.config)
         
+        # NOTE: With supervisor only workers consume, this process still defines channels to publish through them
         self.loaded_channels = await prepare_channels(self.live_connections, self.controllers)
-        await initialize_channels(self.consume_executor, self.loaded_channels)
+        await initialize_channels(self.consume_executor, self.loaded_channels, consume=not self.consumer_supervisor)
 
         if self.use_http_waypoints:
             # self.loaded_waypoints = prepare_httpwaypoints(self.controllers)
@@ -77,6 +93,15 @@ class AscenderFrameworkMicroservices(Plugin):
         self.injector.unleash_update()
 
     async def deinitialize_connections(self):
+        if self.consumer_supervisor:
+            await self.consumer_supervisor.stop()
+
+        if self.consume_executor:
+            await self.consume_executor.drain()
+            self.consume_executor.close_channels()
+
+        await stop_invalidators()
+
         for _, live_conneciton in self.live_connections.items():
             await live_conneciton.disconnect()
         
@@ -0,0 +1,145 @@
+import asyncio
+from collections import deque
+from logging import getLogger
+from time import perf_counter
+from typing import TYPE_CHECKING, Callable
+
+from aio_pika.abc import AbstractChannel
+
+from plugins.microservices._core.consumers import ConsumerRegistration
+from plugins.microservices._core.limiter import ConcurrencyLimiter
+from plugins.microservices.types.autoscale import ScalingDecision
+from plugins.microservices.types.modules import RQControllerQueue
+
+if TYPE_CHECKING:
+    from plugins.microservices.backends.rabbitmq import RabbitMQDriver
+    from plugins.microservices.types.channels import ControllerChannel
+
+
+class _ChannelStats:
+    def __init__(self) -> None:
+        self.latency_total = 0.0
+        self.completed = 0
+        self.peak_in_flight = 0
+
+    def reset(self):
+        self.latency_total = 0.0
+        self.completed = 0
+        self.peak_in_flight = 0
+
+    @property
+    def latency(self):
+        return self.latency_total / self.completed if self.completed else None
+
+
+class ConsumerAutoscaler:
+    def __init__(self, history: int = 256) -> None:
+        self.logger = getLogger("ascender-plugins")
+        self.decisions: deque[ScalingDecision] = deque(maxlen=history)
+
+        self._listeners: list[Callable[[ScalingDecision], None]] = []
+        self._stats: dict["ControllerChannel", _ChannelStats] = {}
+        self._monitor_channels: dict["RabbitMQDriver", AbstractChannel] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    def add_listener(self, listener: Callable[[ScalingDecision], None]):
+        self._listeners.append(listener)
+
+    def observe(self, controller_channel: "ControllerChannel", limiter: ConcurrencyLimiter):
+        return _Observation(self._stats.setdefault(controller_channel, _ChannelStats()), limiter)
+
+    def watch(self, controller_channel: "ControllerChannel", connection: "RabbitMQDriver",
+              consumer: ConsumerRegistration, limiter: ConcurrencyLimiter):
+        self._stats.setdefault(controller_channel, _ChannelStats())
+        self._tasks.append(asyncio.create_task(self.run(controller_channel, connection, consumer, limiter)))
+
+    async def queue_depth(self, connection: "RabbitMQDriver", queue_name: str) -> int:
+        # NOTE: Passive declare of a missing queue closes the channel, so it never runs on consumer channels
+        channel = self._monitor_channels.get(connection)
+        if channel is None or channel.is_closed:
+            channel = self._monitor_channels[connection] = await connection.generate_channel()
+
+        queue = await RQControllerQueue(queue_name, passive=True).declare(channel)
+        return queue.declaration_result.message_count
+
+    async def run(self, controller_channel: "ControllerChannel", connection: "RabbitMQDriver",
+                  consumer: ConsumerRegistration, limiter: ConcurrencyLimiter):
+        policy = controller_channel.autoscale
+        stats = self._stats[controller_channel]
+
+        while True:
+            await asyncio.sleep(policy.interval)
+
+            try:
+                depth = await self.queue_depth(connection, controller_channel.queue_name)
+            except Exception as e:
+                self.logger.warning(f"Autoscaler failed to read depth of {controller_channel.queue_name}: {e}")
+                continue
+
+            latency = stats.latency
+            saturated = max(stats.peak_in_flight, limiter.in_flight) >= limiter.limit
+            stats.reset()
+
+            previous_limit = limiter.limit
+            limit, reason = policy.next_limit(previous_limit, depth, latency, saturated)
+
+            if limit != previous_limit:
+                await limiter.set_limit(limit)
+                # NOTE: Global QoS is the only prefetch RabbitMQ re-applies to an already running consumer
+                try:
+                    await consumer.set_qos(policy.prefetch(limit, controller_channel.batch_size))
+                except Exception as e:
+                    # Prefetch is kept on registration and applied when consumer is restored after reconnect
+                    self.logger.warning(f"Autoscaler failed to apply prefetch of {controller_channel.queue_name}: {e}")
+
+            self.emit({
+                "channel": controller_channel.channel.__name__,
+                "queue": controller_channel.queue_name,
+                "depth": depth,
+                "latency": latency,
+                "previous_limit": previous_limit,
+                "limit": limit,
+                "prefetch": policy.prefetch(limit, controller_channel.batch_size),
+                "reason": reason,
+            })
+
+    def emit(self, decision: ScalingDecision):
+        self.decisions.append(decision)
+
+        if decision["limit"] != decision["previous_limit"]:
+            self.logger.debug(f"Autoscaler changed {decision['channel']} in-flight limit "
+                              f"{decision['previous_limit']} -> {decision['limit']} ({decision['reason']}, "
+                              f"depth {decision['depth']}, latency {decision['latency']})")
+
+        for listener in self._listeners:
+            try:
+                listener(decision)
+            except Exception as e:
+                self.logger.warning(f"Autoscaler listener failed: {e}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        for channel in self._monitor_channels.values():
+            if not channel.is_closed:
+                await channel.close()
+        self._monitor_channels = {}
+
+
+class _Observation:
+    def __init__(self, stats: _ChannelStats, limiter: ConcurrencyLimiter) -> None:
+        self.stats = stats
+        self.limiter = limiter
+
+    def __enter__(self):
+        self.stats.peak_in_flight = max(self.stats.peak_in_flight, self.limiter.in_flight)
+        self._started = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stats.latency_total += perf_counter() - self._started
+        self.stats.completed += 1
@@ -64,9 +64,12 @@ async def prepare_channels(live_connections: LiveConnections, controllers: dict[
 #     return _waypoints
 
 
-async def initialize_channels(consume_executor: ConsumeExecutor, _channels: dict[str, tuple[ControllerChannel, ControllerModule]]):
+async def initialize_channels(consume_executor: ConsumeExecutor, _channels: dict[str, tuple[ControllerChannel, ControllerModule]],
+                              consume: bool = True):
     for name, channel in _channels.items():
-        await consume_executor.define_driver_add((name, channel[1]), channel[0])
+        await consume_executor.define_driver_add((name, channel[1]), channel[0], consume)
+    
+    consume_executor.report_topology()
 
 def initialize_waypoints(_waypoints: list["HTTPWaypoint"],
                          injector: PluginInjector):
@@ -0,0 +1,47 @@
+import asyncio
+from typing import Awaitable, Callable
+
+from aio_pika import IncomingMessage
+
+
+class BatchCollector:
+    def __init__(self, size: int, timeout: float,
+                 flush_handler: Callable[[list[IncomingMessage]], Awaitable[None]]) -> None:
+        if size < 1:
+            raise ValueError("Batch size should be greater than 0")
+
+        self.size = size
+        self.timeout = timeout
+        self.flush_handler = flush_handler
+
+        self._pending: list[IncomingMessage] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._flushes: set[asyncio.Task] = set()
+
+        # NOTE: Batches are settled strictly in order, so `multiple=True` acks never touch a later batch
+        self._lock = asyncio.Lock()
+
+    async def add(self, message: IncomingMessage):
+        self._pending.append(message)
+
+        if len(self._pending) >= self.size:
+            return await self.flush()
+
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.timeout, self._flush_on_timeout)
+
+    def _flush_on_timeout(self):
+        self._timer = None
+        task = asyncio.create_task(self.flush())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        messages, self._pending = self._pending, []
+        async with self._lock:
+            if messages:
+                await self.flush_handler(messages)
@@ -0,0 +1,51 @@
+from itertools import count
+from typing import TYPE_CHECKING
+
+from aio_pika.abc import AbstractChannel
+
+if TYPE_CHECKING:
+    from plugins.microservices.backends.rabbitmq import RabbitMQDriver
+
+
+class ChannelPool:
+    def __init__(self, driver: "RabbitMQDriver", size: int = 4) -> None:
+        if size < 1:
+            raise ValueError("Channel pool size should be greater than 0")
+
+        self.driver = driver
+        self.size = size
+
+        self._channels: list[AbstractChannel | None] = [None] * size
+        self._dedicated: list[AbstractChannel] = []
+        self._cursor = count()
+
+    @property
+    def opened(self):
+        return sum(1 for channel in self._channels if channel is not None and not channel.is_closed)
+
+    @property
+    def dedicated(self):
+        return len(self._dedicated)
+
+    async def acquire(self) -> AbstractChannel:
+        slot = next(self._cursor) % self.size
+        channel = self._channels[slot]
+
+        if channel is None or channel.is_closed:
+            channel = self._channels[slot] = await self.driver.generate_channel()
+
+        return channel
+
+    async def acquire_dedicated(self) -> AbstractChannel:
+        # NOTE: For consumers which own channel-wide state, e.g. QoS or `multiple=True` delivery tag ranges
+        channel = await self.driver.generate_channel()
+        self._dedicated.append(channel)
+        return channel
+
+    async def close(self):
+        for channel in [*self._channels, *self._dedicated]:
+            if channel is not None and not channel.is_closed:
+                await channel.close()
+
+        self._channels = [None] * self.size
+        self._dedicated = []
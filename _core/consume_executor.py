@@ -1,23 +1,61 @@
+import asyncio
 from logging import getLogger
+from aio_pika import IncomingMessage
 from core.types import ControllerModule
+from plugins.microservices._core.autoscaler import ConsumerAutoscaler
+from plugins.microservices._core.consumers import ConsumerRegistration
+from plugins.microservices._core.limiter import ConcurrencyLimiter
+from plugins.microservices._core.scheduler import WeightedFairScheduler
 from plugins.microservices.backends.rabbitmq import RabbitMQDriver
 from plugins.microservices.types.channels import ControllerChannel
+from plugins.microservices.types.config import MainConfig
 from plugins.microservices.types.modules import RQControllerExchanger, RQControllerQueue
 
 
 class ConsumeExecutor:
     def __init__(self, live_connections: dict[str, RabbitMQDriver], 
-                 default_connection: dict[str, RabbitMQDriver]) -> None:
+                 default_connection: dict[str, RabbitMQDriver],
+                 drain_timeout: float = 30.0,
+                 scheduler: WeightedFairScheduler | None = None) -> None:
         self.live_connections = live_connections
         self.default_connection = default_connection
+        self.drain_timeout = drain_timeout
+        self.scheduler = scheduler
         self.logger = getLogger("ascender-plugins")
         self.__channels: dict[str, list[ControllerChannel]] = {}
+        self.__limiters: dict[ControllerChannel, ConcurrencyLimiter] = {}
+        self.__consumers: list[tuple[RabbitMQDriver, ConsumerRegistration]] = []
+        self.__in_flight: dict[asyncio.Task, tuple[IncomingMessage, ControllerChannel]] = {}
+        self.autoscaler = ConsumerAutoscaler()
+
+        self.drained = 0
+        self.abandoned = 0
+
+    @classmethod
+    def from_config(cls, live_connections: dict[str, RabbitMQDriver], config: MainConfig):
+        scheduler = None
+        if priority_scheduling := config.get("priority_scheduling", None):
+            scheduler = WeightedFairScheduler(priority_scheduling["budget"], priority_scheduling["classes"])
+
+        return cls(live_connections=live_connections,
+                   default_connection=config["default_connection"],
+                   drain_timeout=config.get("drain_timeout", 30.0),
+                   scheduler=scheduler)
 
     @property
     def channels(self):
         return self.__channels
 
-    async def define_driver_add(self, controller: tuple[str, ControllerModule], controller_channel: ControllerChannel):
+    @property
+    def limiters(self):
+        return self.__limiters
+
+    @property
+    def in_flight(self):
+        return len(self.__in_flight)
+
+    async def define_driver_add(self, controller: tuple[str, ControllerModule], controller_channel: ControllerChannel,
+                                consume: bool = True):
         connection = self.live_connections.get(controller_channel.connection, None) if controller_channel.connection else self.live_connections.get(self.default_connection)
 
         if not connection and controller_channel.connection:
@@ -25,32 +63,179 @@ class ConsumeExecutor:
             connection = self.default_connection
 
         if isinstance(connection, RabbitMQDriver):
-            await self.add_controller_rmq(controller, controller_channel, connection)
+            await self.add_controller_rmq(controller, controller_channel, connection, consume)
 
-    async def add_controller_rmq(self, controller: tuple[str, ControllerModule], controller_channel: ControllerChannel, connection: RabbitMQDriver):
+    def exchanger_spec(self, controller: tuple[str, ControllerModule], controller_channel: ControllerChannel):
+        if not controller_channel.enable_controller_exchanger:
+            return RQControllerExchanger(name="ascender_framework.root", exchange_type="direct")
+        
+        if controller_channel.controller_exchanger:
+            return controller_channel.controller_exchanger
+        
+        return RQControllerExchanger(name=controller[0], exchange_type="direct")
+
+    def register_channel(self, controller: tuple[str, ControllerModule], controller_channel: ControllerChannel):
+        if self.__channels.get(controller[0]):
+            self.__channels[controller[0]].append(controller_channel)
+        
+        else:
+            self.__channels[controller[0]] = [controller_channel]
+
+    async def add_controller_rmq(self, controller: tuple[str, ControllerModule], controller_channel: ControllerChannel, connection: RabbitMQDriver,
+                                 consume: bool = True):
         
         if not isinstance(connection, RabbitMQDriver):
             # TODO: Implement custom exception
             raise ValueError("Wrong driver!")
 
-        _channel = await connection.generate_channel()
+        if not consume:
+            return await self.add_publisher_rmq(controller, controller_channel, connection)
+
+        consumer = ConsumerRegistration(self.bound_callback(controller_channel),
+                                        no_ack=not controller_channel.auto_acknowledgement,
+                                        dedicated=controller_channel.prefetch_count is not None
+                                        or controller_channel.prefetch_size is not None
+                                        or bool(controller_channel.batch_size),
+                                        prefetch_count=controller_channel.prefetch_count,
+                                        prefetch_size=controller_channel.prefetch_size,
+                                        # NOTE: Autoscaled prefetch is changed on a running consumer, which RabbitMQ only honours for global QoS
+                                        global_qos=bool(controller_channel.autoscale),
+                                        on_restore=controller_channel.rebind)
+        _channel = await consumer.open(connection)
+
+        exchanger = await connection.topology.exchange(_channel, self.exchanger_spec(controller, controller_channel))
+        queue = await connection.topology.queue(_channel, controller_channel.queue or RQControllerQueue())
+        await connection.topology.bind(queue, exchanger, controller_channel.routing_key)
+
+        controller_channel.queue_name = queue.name
+        if controller_channel.retry_policy:
+            await controller_channel.retry_policy.declare(connection.topology, _channel, queue.name)
         
-        exchanger = await RQControllerExchanger(name="ascender_framework.root", exchange_type="direct").build(_channel)
+        controller_channel.define_channel(exchanger, connection.outbox)
+
+        consumer.exchange_name = exchanger.name
+        await consumer.consume(queue)
+        # Registered on the driver, so it's restored on the new connection after reconnect
+        connection.consumers.append(consumer)
+        self.__consumers.append((connection, consumer))
+
+        if controller_channel.autoscale:
+            self.autoscaler.watch(controller_channel, connection, consumer, self.__limiters[controller_channel])
+
+        self.register_channel(controller, controller_channel)
+
+    async def add_publisher_rmq(self, controller: tuple[str, ControllerModule], controller_channel: ControllerChannel, connection: RabbitMQDriver):
+        # NOTE: Process which doesn't consume (supervisor's parent) still publishes through channel singletons.
+        # Queue isn't declared here, an unconsumed server-named queue would only pile up messages
+        publisher = ConsumerRegistration(None, on_restore=controller_channel.rebind)
+        _channel = await publisher.open(connection)
+
+        exchanger = await connection.topology.exchange(_channel, self.exchanger_spec(controller, controller_channel))
+        controller_channel.define_channel(exchanger, connection.outbox)
+
+        publisher.exchange_name = exchanger.name
+        # Restored with consumers, so exchange of the singleton is moved to the new connection after reconnect
+        connection.consumers.append(publisher)
+        self.register_channel(controller, controller_channel)
+
+    def report_topology(self):
+        for name, connection in self.live_connections.items():
+            if not isinstance(connection, RabbitMQDriver):
+                continue
 
-        if controller_channel.enable_controller_exchanger:
-            if controller_channel.controller_exchanger:
-                exchanger = await controller_channel.controller_exchanger.build(_channel)
-            else:
-                exchanger = await RQControllerExchanger(name=controller[0], exchange_type="direct").build(_channel)
+            report = connection.topology.report()
+            self.logger.info(f"Connection [bold]{name}[/bold] declared {len(report['exchanges'])} exchanges, "
+                             f"{len(report['queues'])} queues, {len(report['bindings'])} bindings "
+                             f"over {connection.channel_pool.opened} pooled & {connection.channel_pool.dedicated} dedicated channels")
+            self.logger.debug(f"Connection [bold]{name}[/bold] topology: {report}")
+
+    def close_channels(self):
+        for controller_channels in self.__channels.values():
+            for controller_channel in controller_channels:
+                controller_channel.close()
+
+    async def drain(self):
+        await self.autoscaler.stop()
+
+        # Stop deliveries first, so nothing new lands while in-flight work is finishing
+        for connection, consumer in self.__consumers:
+            if consumer in connection.consumers:
+                connection.consumers.remove(consumer)
+
+            try:
+                await consumer.cancel()
+            except Exception as e:
+                self.logger.warning(f"Failed to cancel consumer {consumer.consumer_tag} of queue {consumer.queue_name}: {e}")
+        self.__consumers = []
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.drain_timeout
+
+        # Partially collected batches are handled instead of being left for redelivery
+        flushes = [controller_channel.flush() for controller_channels in self.__channels.values()
+                   for controller_channel in controller_channels]
+        if flushes:
+            await asyncio.wait([asyncio.ensure_future(flush) for flush in flushes], timeout=self.drain_timeout)
+
+        pending = set(self.__in_flight)
+        if pending:
+            self.logger.info(f"Draining {len(pending)} in-flight messages (deadline {self.drain_timeout}s)...")
+            done, pending = await asyncio.wait(pending, timeout=max(deadline - loop.time(), 0))
+            self.drained += len(done)
+
+        # NOTE: Cancelled `message.process()` would reject without requeue, abandoned messages are handed back first
+        for task in pending:
+            message, controller_channel = self.__in_flight.get(task, (None, None))
+            if message is not None and controller_channel.auto_acknowledgement and not message.processed:
+                try:
+                    await message.nack(requeue=True)
+                except Exception as e:
+                    self.logger.warning(f"Failed to requeue abandoned message {message.delivery_tag}: {e}")
+
+            task.cancel()
+        self.abandoned += len(pending)
+
+        self.logger.info(f"Consume executor drained {self.drained} messages, abandoned {self.abandoned}")
+        return {"drained": self.drained, "abandoned": self.abandoned}
+
+    def bound_callback(self, controller_channel: ControllerChannel):
+        limiter = None
+        priority_class = controller_channel.priority_class
+
+        if controller_channel.max_concurrency:
+            limiter = ConcurrencyLimiter(controller_channel.max_concurrency)
+            self.__limiters[controller_channel] = limiter
+
+        if priority_class:
+            if not self.scheduler:
+                raise ValueError(f"Channel {controller_channel.channel.__name__} has priority class {priority_class!r}, "
+                                 "but `priority_scheduling` isn't configured")
             
-        queue = await controller_channel.queue.build(_channel, exchanger, controller_channel.routing_key) if controller_channel.queue else await RQControllerQueue().build(_channel, exchanger, controller_channel.routing_key)
-        
-        controller_channel.define_channel(exchanger)
-        
-        await queue.consume(controller_channel.callback, not controller_channel.auto_acknowledgement)
+            self.scheduler.check_class(priority_class)
 
-        if self.__channels.get(controller[0]):
-            self.__channels[controller[0]].append(controller_channel)
-        
-        else:
-            self.__channels[controller[0]] = [controller_channel]
\ No newline at end of file
+        async def scheduled_callback(message: IncomingMessage):
+            if not priority_class:
+                return await controller_channel.callback(message)
+
+            async with self.scheduler.slot(priority_class):
+                return await controller_channel.callback(message)
+
+        async def callback(message: IncomingMessage):
+            task = asyncio.current_task()
+            self.__in_flight[task] = (message, controller_channel)
+
+            try:
+                if not limiter:
+                    return await scheduled_callback(message)
+
+                # NOTE: Waiting here holds the delivery unacknowledged, so the broker stops pushing once prefetch is exhausted
+                async with limiter:
+                    if not controller_channel.autoscale:
+                        return await scheduled_callback(message)
+
+                    with self.autoscaler.observe(controller_channel, limiter):
+                        return await scheduled_callback(message)
+            finally:
+                self.__in_flight.pop(task, None)
+
+        return callback
@@ -0,0 +1,113 @@
+import asyncio
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+from aio_pika import IncomingMessage
+from aio_pika.abc import AbstractChannel, AbstractExchange, AbstractQueue
+
+if TYPE_CHECKING:
+    from plugins.microservices.backends.rabbitmq import RabbitMQDriver
+
+
+class ConsumerRegistration:
+    def __init__(self, callback: Callable[[IncomingMessage], Awaitable[Any]] | None, *,
+                 no_ack: bool = False,
+                 dedicated: bool = False,
+                 prefetch_count: int | None = None,
+                 prefetch_size: int | None = None,
+                 global_qos: bool = False,
+                 exchange_name: str | None = None,
+                 on_restore: Callable[["ConsumerRegistration"], None] | None = None) -> None:
+        self.callback = callback
+        self.no_ack = no_ack
+        self.dedicated = dedicated
+        self.prefetch_count = prefetch_count
+        self.prefetch_size = prefetch_size
+        self.global_qos = global_qos
+        self.exchange_name = exchange_name
+        self.on_restore = on_restore
+
+        self.queue_name: str | None = None
+        self.channel: AbstractChannel | None = None
+        self.queue: AbstractQueue | None = None
+        self.exchange: AbstractExchange | None = None
+        self.consumer_tag: str | None = None
+
+        self.driver: "RabbitMQDriver | None" = None
+        self._restoring: asyncio.Task | None = None
+
+    @property
+    def has_qos(self):
+        return self.prefetch_count is not None or self.prefetch_size is not None
+
+    async def open(self, driver: "RabbitMQDriver") -> AbstractChannel:
+        self.driver = driver
+
+        # NOTE: QoS and `multiple=True` acknowledgements are channel-wide, such consumers can't share pooled channel
+        if self.dedicated:
+            self.channel = await driver.channel_pool.acquire_dedicated()
+        else:
+            self.channel = await driver.channel_pool.acquire()
+
+        self.channel.close_callbacks.add(self._on_channel_close)
+
+        if self.has_qos:
+            await self.set_qos()
+
+        return self.channel
+
+    async def set_qos(self, prefetch_count: int | None = None):
+        # Kept on registration, so restored consumer comes back with the latest (e.g. autoscaled) prefetch
+        if prefetch_count is not None:
+            self.prefetch_count = prefetch_count
+
+        await self.channel.set_qos(prefetch_count=self.prefetch_count or 0,
+                                   prefetch_size=self.prefetch_size or 0,
+                                   global_=self.global_qos)
+
+    async def consume(self, queue: AbstractQueue):
+        self.queue = queue
+        self.queue_name = queue.name
+        self.consumer_tag = await queue.consume(self.callback, no_ack=self.no_ack)
+
+    async def restore(self, driver: "RabbitMQDriver", renamed: dict[str, str]):
+        self.queue_name = renamed.get(self.queue_name, self.queue_name)
+        await self.open(driver)
+
+        if self.exchange_name is not None:
+            self.exchange = await self.channel.get_exchange(self.exchange_name, ensure=False)
+
+        # NOTE: Registration without callback only keeps publishing exchange alive, e.g. in supervisor's parent process
+        if self.callback is not None:
+            await self.consume(await self.channel.get_queue(self.queue_name, ensure=False))
+
+        if self.on_restore:
+            self.on_restore(self)
+
+    def _on_channel_close(self, sender: Any, exc: BaseException | None = None):
+        # NOTE: Lost connection is recovered by the driver, here only channel-level errors are handled,
+        # e.g. 404 of a publish on delivery's channel or failed precondition, which close just this channel
+        if not self.driver.healthy or self._restoring is not None:
+            return None
+
+        self.driver.logger.warning(f"Channel of consumer {self.consumer_tag} (queue {self.queue_name}) was closed: {exc}, restoring...")
+        self._restoring = asyncio.create_task(self._restore_channel())
+
+    async def _restore_channel(self):
+        try:
+            # Connection close is reported to channels as well, driver's reconnect is given a chance to start first
+            await asyncio.sleep(0)
+
+            while self.driver.healthy:
+                try:
+                    return await self.restore(self.driver, {})
+                except Exception as e:
+                    self.driver.logger.warning(f"Failed to restore consumer of queue {self.queue_name}: {e}, retrying...")
+                    await asyncio.sleep(self.driver.reconnect_delay)
+        finally:
+            self._restoring = None
+
+    async def cancel(self):
+        if self.consumer_tag is None:
+            return None
+
+        await self.queue.cancel(self.consumer_tag)
@@ -0,0 +1,48 @@
+from asyncio import Condition
+
+
+class ConcurrencyLimiter:
+    def __init__(self, limit: int) -> None:
+        if limit < 1:
+            raise ValueError("Concurrency limit should be greater than 0")
+
+        self._limit = limit
+        self._in_flight = 0
+        self._condition = Condition()
+
+    @property
+    def limit(self):
+        return self._limit
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    @property
+    def saturated(self):
+        return self._in_flight >= self._limit
+
+    async def set_limit(self, limit: int):
+        if limit < 1:
+            raise ValueError("Concurrency limit should be greater than 0")
+
+        async with self._condition:
+            self._limit = limit
+            self._condition.notify_all()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < self._limit)
+            self._in_flight += 1
+
+    async def release(self):
+        async with self._condition:
+            self._in_flight -= 1
+            self._condition.notify()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.release()
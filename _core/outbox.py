@@ -0,0 +1,358 @@
+import asyncio
+import base64
+import fcntl
+import json
+import mmap
+import os
+import struct
+from collections import deque
+from datetime import datetime, timedelta
+from decimal import Decimal
+from logging import getLogger
+from time import perf_counter
+from typing import TYPE_CHECKING, Any
+
+from aio_pika import Message
+
+from plugins.microservices._core.pipeline import pipelined_publish
+
+if TYPE_CHECKING:
+    from plugins.microservices.backends.rabbitmq import RabbitMQDriver
+
+
+def encode_property(value: Any):
+    # NOTE: Message properties & headers may carry values JSON can't hold, they're tagged to be restored on load
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, timedelta):
+        return {"$timedelta": value.total_seconds()}
+    if isinstance(value, (bytes, bytearray)):
+        return {"$bytes": base64.b64encode(value).decode("ascii")}
+    if isinstance(value, Decimal):
+        return {"$decimal": str(value)}
+
+    raise TypeError(f"Outbox can't persist message property of type {type(value).__name__}")
+
+
+def decode_property(value: dict[str, Any]):
+    if len(value) != 1:
+        return value
+
+    match next(iter(value.items())):
+        case ("$datetime", encoded):
+            return datetime.fromisoformat(encoded)
+        case ("$timedelta", encoded):
+            return timedelta(seconds=encoded)
+        case ("$bytes", encoded):
+            return base64.b64decode(encoded)
+        case ("$decimal", encoded):
+            return Decimal(encoded)
+
+    return value
+
+
+class OutboxRecord:
+    __slots__ = ("exchange", "routing_key", "body", "properties", "_meta")
+
+    def __init__(self, exchange: str, routing_key: str, body: bytes, properties: dict[str, Any]) -> None:
+        self.exchange = exchange
+        self.routing_key = routing_key
+        self.body = body
+        self.properties = properties
+        self._meta: bytes | None = None
+
+    def meta(self) -> bytes:
+        if self._meta is None:
+            self._meta = json.dumps({"exchange": self.exchange, "routing_key": self.routing_key,
+                                     "properties": self.properties},
+                                    separators=(",", ":"), default=encode_property).encode("utf-8")
+        return self._meta
+
+    def dump(self) -> bytes:
+        meta = self.meta()
+        return struct.pack("<II", len(meta), len(self.body)) + meta + self.body
+
+    @classmethod
+    def load(cls, buffer: mmap.mmap, offset: int) -> tuple["OutboxRecord", int]:
+        meta_size, body_size = struct.unpack_from("<II", buffer, offset)
+        offset += 8
+        meta = json.loads(buffer[offset:offset + meta_size], object_hook=decode_property)
+        offset += meta_size
+        body = bytes(buffer[offset:offset + body_size])
+        return cls(meta["exchange"], meta["routing_key"], body, meta["properties"]), offset + body_size
+
+
+class SpillFile:
+    # NOTE: Header keeps read & write offsets, so unread records survive restarts
+    header = struct.Struct("<QQ")
+
+    def __init__(self, path: str, initial_size: int = 1 << 20) -> None:
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+
+        # NOTE: Offsets in the header are owned by a single writer, second process would corrupt them
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(self._fd)
+            raise RuntimeError(f"Outbox spill file {path} is already used by another process, "
+                               "every process needs its own `spill_path`") from None
+
+        exists = os.fstat(self._fd).st_size >= self.header.size
+        if not exists:
+            os.ftruncate(self._fd, max(initial_size, self.header.size))
+
+        self._map = mmap.mmap(self._fd, os.fstat(self._fd).st_size)
+
+        if exists:
+            self.write_offset, self.read_offset = self.header.unpack_from(self._map, 0)
+            self.records = self._count()
+        else:
+            self.write_offset = self.read_offset = self.header.size
+            self.records = 0
+            self._sync_header()
+
+    @property
+    def size(self):
+        return self.write_offset - self.read_offset
+
+    def _count(self):
+        count, offset = 0, self.read_offset
+        while offset < self.write_offset:
+            meta_size, body_size = struct.unpack_from("<II", self._map, offset)
+            offset += 8 + meta_size + body_size
+            count += 1
+        return count
+
+    def _sync_header(self):
+        self.header.pack_into(self._map, 0, self.write_offset, self.read_offset)
+
+    def _ensure_capacity(self, size: int):
+        if self.write_offset + size <= len(self._map):
+            return None
+
+        capacity = len(self._map)
+        while self.write_offset + size > capacity:
+            capacity *= 2
+
+        self._map.close()
+        os.ftruncate(self._fd, capacity)
+        self._map = mmap.mmap(self._fd, capacity)
+
+    def append(self, records: list[OutboxRecord]):
+        data = b"".join(record.dump() for record in records)
+        self._ensure_capacity(len(data))
+
+        self._map[self.write_offset:self.write_offset + len(data)] = data
+        self.write_offset += len(data)
+        self.records += len(records)
+        self._sync_header()
+
+    def read(self, limit: int) -> tuple[list[OutboxRecord], int]:
+        records, offset = [], self.read_offset
+        while offset < self.write_offset and len(records) < limit:
+            record, offset = OutboxRecord.load(self._map, offset)
+            records.append(record)
+
+        return records, offset
+
+    def commit(self, offset: int, count: int):
+        self.read_offset = offset
+        self.records -= count
+
+        # Fully drained file is rewound, so it never grows while broker keeps up
+        if self.read_offset >= self.write_offset:
+            self.read_offset = self.write_offset = self.header.size
+            self.records = 0
+
+        self._sync_header()
+
+    def close(self):
+        self._map.flush()
+        self._map.close()
+        os.close(self._fd)
+
+
+class PublishOutbox:
+    def __init__(self, driver: "RabbitMQDriver", *,
+                 capacity: int = 10_000,
+                 batch_size: int = 256,
+                 flush_interval: float = 0.05,
+                 retry_delay: float = 1.0,
+                 drain_timeout: float = 5.0,
+                 spill_path: str | None = None) -> None:
+        self.driver = driver
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_delay = retry_delay
+        self.drain_timeout = drain_timeout
+        self.spill_path = spill_path
+
+        self.logger = getLogger("ascender-plugins")
+        self.spill: SpillFile | None = None
+
+        self._buffer: deque[OutboxRecord] = deque()
+        self._wakeup = asyncio.Event()
+        self._flusher: asyncio.Task | None = None
+        self._stopping = False
+
+        self.flushed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.flush_latency_last = 0.0
+        self.flush_latency_total = 0.0
+
+    @property
+    def depth(self):
+        return len(self._buffer) + (self.spill.records if self.spill else 0)
+
+    def stats(self):
+        return {
+            "depth": self.depth,
+            "memory_depth": len(self._buffer),
+            "spilled_records": self.spill.records if self.spill else 0,
+            "spill_bytes": self.spill.size if self.spill else 0,
+            "flushed": self.flushed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "flush_latency_last": self.flush_latency_last,
+            "flush_latency_avg": self.flush_latency_total / self.flushes if self.flushes else 0.0,
+        }
+
+    def start(self):
+        self._stopping = False
+        if self.spill_path:
+            self.spill = SpillFile(self.spill_path)
+
+            if self.spill.records:
+                self.logger.info(f"Outbox is replaying {self.spill.records} spilled messages from {self.spill_path}")
+
+        self._flusher = asyncio.create_task(self.run())
+
+    def enqueue(self, exchange: str, routing_key: str, body: bytes, properties: dict[str, Any]):
+        record = OutboxRecord(exchange, routing_key, body, properties)
+
+        # Record which may end up in spill file is encoded right away, so unsupported property fails the caller
+        # instead of a later spill or close
+        if self.spill:
+            record.meta()
+
+        # NOTE: Once anything is spilled, new records follow it to the file to keep publication order
+        if self.spill and (self.spill.records or len(self._buffer) >= self.capacity):
+            self.spill.append([record])
+        elif len(self._buffer) >= self.capacity:
+            self.dropped += 1
+            raise OverflowError("Publish outbox is full and no `spill_path` is configured")
+        else:
+            self._buffer.append(record)
+
+        if len(self._buffer) >= self.batch_size or (self.spill and self.spill.records):
+            self._wakeup.set()
+
+    def _take(self) -> tuple[list[OutboxRecord], int | None]:
+        if self._buffer:
+            return [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))], None
+
+        if self.spill and self.spill.records:
+            return self.spill.read(self.batch_size)
+
+        return [], None
+
+    async def _publish(self, record: OutboxRecord):
+        async with self.driver.publisher_pool.channel() as (slot, _):
+            exchange = await self.driver.publisher_pool.exchange(slot, record.exchange)
+            return await exchange.publish(Message(record.body, **record.properties), routing_key=record.routing_key)
+
+    async def flush_once(self) -> bool:
+        records, spill_offset = self._take()
+        if not records:
+            return False
+
+        acked: set[int] = set()
+
+        async def on_settled(index: int, record: OutboxRecord, state: Any):
+            if state == "Basic.Ack":
+                acked.add(index)
+
+        started = perf_counter()
+        try:
+            result = await pipelined_publish(records, self._publish, window=self.batch_size,
+                                             on_settled=on_settled, stop_on_failure=False)
+        except asyncio.CancelledError:
+            # NOTE: Records are already taken off the buffer, unconfirmed ones go back in front of it.
+            # Spilled batch stays in the file, as its read offset isn't committed
+            if spill_offset is None:
+                self._buffer.extendleft(record for index, record in reversed(list(enumerate(records)))
+                                        if index not in acked)
+            raise
+
+        self.flush_latency_last = perf_counter() - started
+        self.flush_latency_total += self.flush_latency_last
+        self.flushes += 1
+        self.flushed += len(result.acked)
+
+        if spill_offset is not None:
+            self.spill.commit(spill_offset, len(records))
+
+        if not result.ok:
+            failed = sorted({*result.nacked, *result.rejected, *result.errors})
+            self.failed += len(failed)
+
+            # Failed records go back in front of the queue, flusher backs off before retrying them
+            self._buffer.extendleft(records[index] for index in reversed(failed))
+            await asyncio.sleep(self.retry_delay)
+
+        return True
+
+    async def run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                while not self._stopping and await self.flush_once():
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.warning(f"Outbox flush failed, retrying in {self.retry_delay}s: {e}")
+                await asyncio.sleep(self.retry_delay)
+
+    async def _drain(self):
+        while await self.flush_once():
+            pass
+
+    async def close(self):
+        if self._flusher:
+            # Flusher stops after the batch in progress, it's cancelled only if that doesn't settle in time
+            self._stopping = True
+            self._wakeup.set()
+
+            _, pending = await asyncio.wait({self._flusher}, timeout=self.drain_timeout)
+            if pending:
+                self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+
+        # NOTE: Without spill file whatever is left in memory is lost, so it gets a last bounded flush
+        if not self.spill and self._buffer:
+            try:
+                await asyncio.wait_for(self._drain(), self.drain_timeout)
+            except asyncio.TimeoutError:
+                self.logger.warning(f"Outbox closed with {len(self._buffer)} unpublished messages")
+
+        # Unsent memory records are persisted in front of not yet replayed ones
+        if self.spill:
+            if self._buffer:
+                pending, offset = self.spill.read(self.spill.records)
+                self.spill.commit(offset, len(pending))
+                self.spill.append([*self._buffer, *pending])
+                self._buffer.clear()
+
+            self.spill.close()
+            self.spill = None
@@ -0,0 +1,57 @@
+import asyncio
+from collections import deque
+from typing import Any, AsyncIterable, Awaitable, Callable, Iterable, TypeVar
+
+from plugins.microservices.types.publication import PublicationResult
+
+T = TypeVar("T")
+
+
+async def _iterate(items: AsyncIterable[T] | Iterable[T]):
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def pipelined_publish(items: AsyncIterable[T] | Iterable[T],
+                            publish: Callable[[T], Awaitable[Any]], *,
+                            window: int,
+                            on_settled: Callable[[int, T, Any], Awaitable[None]] | None = None,
+                            stop_on_failure: bool = True) -> PublicationResult:
+    if window < 1:
+        raise ValueError("Publication window should be greater than 0")
+
+    result = PublicationResult()
+    outstanding: deque[tuple[int, T, asyncio.Task]] = deque()
+
+    async def settle_head():
+        index, item, task = outstanding.popleft()
+        try:
+            delivery = await task
+            state = delivery.name
+        except Exception as e:
+            state = e
+
+        result.record(index, state)
+        if on_settled:
+            await on_settled(index, item, state)
+
+    # NOTE: Up to `window` publishes wait for confirms concurrently, while settlement is strictly in submission order
+    index = 0
+    async for item in _iterate(items):
+        if stop_on_failure and not result.ok:
+            break
+
+        outstanding.append((index, item, asyncio.ensure_future(publish(item))))
+        index += 1
+
+        if len(outstanding) >= window:
+            await settle_head()
+
+    while outstanding:
+        await settle_head()
+
+    return result
@@ -0,0 +1,134 @@
+import asyncio
+from contextlib import asynccontextmanager
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+from aio_pika.abc import AbstractChannel, AbstractConnection, AbstractExchange
+
+if TYPE_CHECKING:
+    from plugins.microservices.backends.rabbitmq import RabbitMQDriver
+
+
+class _PublisherChannel:
+    def __init__(self, connection_index: int) -> None:
+        self.connection_index = connection_index
+        self.channel: AbstractChannel | None = None
+        self.exchanges: dict[str, AbstractExchange] = {}
+        self.in_flight = 0
+
+
+class PublisherPool:
+    def __init__(self, driver: "RabbitMQDriver", size: int = 4, *,
+                 connections: int = 1,
+                 max_in_flight: int = 256) -> None:
+        if size < 1 or connections < 1:
+            raise ValueError("Publisher pool should have at least 1 channel and 1 connection")
+
+        self.driver = driver
+        self.size = size
+        self.connections = connections
+        self.max_in_flight = max_in_flight
+
+        # NOTE: Channels are spread round-robin over connections, connection 0 is driver's own connection
+        self._extra_connections: list[AbstractConnection | None] = [None] * (connections - 1)
+        self._channels = [_PublisherChannel(index % connections) for index in range(size)]
+        self._capacity = asyncio.Semaphore(size * max_in_flight)
+        self._verified_exchanges: set[str] = set()
+        self._open_lock = asyncio.Lock()
+
+        self.publishes = 0
+        self.waits = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    @property
+    def in_flight(self):
+        return sum(slot.in_flight for slot in self._channels)
+
+    @property
+    def saturation(self):
+        return self.in_flight / (self.size * self.max_in_flight)
+
+    def stats(self):
+        return {
+            "channels": self.size,
+            "connections": self.connections,
+            "in_flight": self.in_flight,
+            "saturation": self.saturation,
+            "publishes": self.publishes,
+            "waits": self.waits,
+            "wait_time_total": self.wait_time_total,
+            "wait_time_max": self.wait_time_max,
+            "wait_time_avg": self.wait_time_total / self.waits if self.waits else 0.0,
+        }
+
+    async def _connection(self, index: int) -> AbstractConnection:
+        if index == 0:
+            return self.driver.connection
+
+        connection = self._extra_connections[index - 1]
+        if connection is None or connection.is_closed:
+            connection = self._extra_connections[index - 1] = await self.driver.open_connection()
+
+        return connection
+
+    async def _open(self, slot: _PublisherChannel) -> AbstractChannel:
+        if slot.channel is not None and not slot.channel.is_closed:
+            return slot.channel
+
+        async with self._open_lock:
+            if slot.channel is None or slot.channel.is_closed:
+                connection = await self._connection(slot.connection_index)
+                slot.channel = await connection.channel()
+                slot.exchanges = {}
+
+        return slot.channel
+
+    @asynccontextmanager
+    async def channel(self):
+        if self._capacity.locked():
+            started = perf_counter()
+            await self._capacity.acquire()
+            waited = perf_counter() - started
+
+            self.waits += 1
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+        else:
+            await self._capacity.acquire()
+
+        # Least loaded channel takes the publish, confirms of one channel don't hold others back
+        slot = min(self._channels, key=lambda slot: slot.in_flight)
+        slot.in_flight += 1
+        self.publishes += 1
+
+        try:
+            yield slot, await self._open(slot)
+        finally:
+            slot.in_flight -= 1
+            self._capacity.release()
+
+    async def exchange(self, slot: _PublisherChannel, name: str) -> AbstractExchange:
+        if name == "":
+            return slot.channel.default_exchange
+
+        if (exchange := slot.exchanges.get(name)) is not None:
+            return exchange
+
+        # NOTE: Existence is verified once per pool, other channels bind the cached name without round-trip
+        ensure = name not in self._verified_exchanges and name not in self.driver.topology.exchanges
+        exchange = slot.exchanges[name] = await slot.channel.get_exchange(name, ensure=ensure)
+        self._verified_exchanges.add(name)
+        return exchange
+
+    async def close(self):
+        for slot in self._channels:
+            if slot.channel is not None and not slot.channel.is_closed:
+                await slot.channel.close()
+            slot.channel = None
+            slot.exchanges = {}
+
+        for connection in self._extra_connections:
+            if connection is not None and not connection.is_closed:
+                await connection.close()
+        self._extra_connections = [None] * (self.connections - 1)
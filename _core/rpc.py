@@ -0,0 +1,105 @@
+import asyncio
+from typing import TYPE_CHECKING, Any, Callable
+from uuid import uuid4
+
+from aio_pika import IncomingMessage, Message
+from aio_pika.abc import AbstractChannel
+
+from plugins.microservices.parsers.consume_handle import ConsumeHandleParser
+from plugins.microservices.serialization.codecs import codec_registry
+from plugins.microservices.serialization.compression import decompress
+
+if TYPE_CHECKING:
+    from plugins.microservices.backends.rabbitmq import RabbitMQDriver
+
+
+DIRECT_REPLY_TO = "amq.rabbitmq.reply-to"
+
+
+class RPCClient:
+    def __init__(self, driver: "RabbitMQDriver") -> None:
+        self.driver = driver
+        self.futures: dict[str, asyncio.Future[IncomingMessage]] = {}
+        self.validators: dict[Any, tuple[Callable[[bytes], Any], Callable[[Any], Any]]] = {}
+
+        self._channel: AbstractChannel | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def in_flight(self):
+        return len(self.futures)
+
+    async def channel(self) -> AbstractChannel:
+        if self._channel is not None and not self._channel.is_closed:
+            return self._channel
+
+        async with self._lock:
+            if self._channel is None or self._channel.is_closed:
+                # NOTE: Direct reply-to requires requests to be published on the channel consuming replies,
+                # so every call of this connection is multiplexed over this single channel
+                channel = await self.driver.generate_channel()
+                channel.close_callbacks.add(self._on_close)
+
+                reply_queue = await channel.get_queue(DIRECT_REPLY_TO, ensure=False)
+                await reply_queue.consume(self._on_response, no_ack=True)
+                self._channel = channel
+
+        return self._channel
+
+    def _on_response(self, message: IncomingMessage):
+        if not message.correlation_id:
+            return None
+
+        future = self.futures.pop(message.correlation_id, None)
+        if future is not None and not future.done():
+            future.set_result(message)
+
+    def _on_close(self, *args):
+        self._channel = None
+        futures, self.futures = self.futures, {}
+
+        for future in futures.values():
+            if not future.done():
+                future.set_exception(ConnectionError("RPC reply channel was closed"))
+
+    async def call(self, exchange: str, routing_key: str, body: Any, *,
+                   timeout: float | None = 30.0,
+                   content_type: str | None = None,
+                   response_model: type | None = None) -> Any:
+        channel = await self.channel()
+        codec = codec_registry.get(content_type)
+
+        correlation_id = uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self.futures[correlation_id] = future
+
+        try:
+            _exchange = channel.default_exchange if exchange == "" else await channel.get_exchange(exchange, ensure=False)
+            await _exchange.publish(Message(codec.serialize(body), content_type=codec.content_type,
+                                            correlation_id=correlation_id, reply_to=DIRECT_REPLY_TO),
+                                    routing_key=routing_key)
+
+            response = await asyncio.wait_for(future, timeout)
+        finally:
+            self.futures.pop(correlation_id, None)
+
+        data = decompress(response.body, response.content_encoding)
+        response_codec = codec_registry.get(response.content_type)
+
+        if response_model is None:
+            return response_codec.decode(data)
+
+        # NOTE: Building a TypeAdapter costs far more than a call's validation, so it's done once per model
+        if (validators := self.validators.get(response_model)) is None:
+            validators = self.validators[response_model] = ConsumeHandleParser.compile_validators(response_model)
+
+        json_validator, python_validator = validators
+        if response_codec.json_compatible:
+            return json_validator(data)
+
+        return python_validator(response_codec.decode(data))
+
+    async def close(self):
+        if self._channel is not None and not self._channel.is_closed:
+            await self._channel.close()
+        self._channel = None
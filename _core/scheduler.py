@@ -0,0 +1,98 @@
+import asyncio
+from collections import deque
+
+
+class WeightedFairScheduler:
+    def __init__(self, budget: int, weights: dict[str, int]) -> None:
+        if budget < 1:
+            raise ValueError("Concurrency budget should be greater than 0")
+
+        if any(weight < 1 for weight in weights.values()):
+            raise ValueError("Priority class weights should be greater than 0")
+
+        self.budget = budget
+        self.weights = weights
+
+        self._in_flight = 0
+        self._clock = 0.0
+        self._virtual_time = {name: 0.0 for name in weights}
+        self._waiters: dict[str, deque[asyncio.Future]] = {name: deque() for name in weights}
+        self.served = {name: 0 for name in weights}
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    @property
+    def waiting(self):
+        return {name: len(waiters) for name, waiters in self._waiters.items()}
+
+    def check_class(self, priority_class: str):
+        if priority_class not in self.weights:
+            raise ValueError(f"Priority class {priority_class!r} isn't configured, available: {list(self.weights)}")
+
+    def _charge(self, priority_class: str):
+        # NOTE: Every execution advances class's virtual time by 1/weight, the lowest virtual time is served first.
+        # Idle classes don't bank credit, they're charged from current virtual time, which never goes back
+        virtual_time = max(self._virtual_time[priority_class], self._clock)
+        self._clock = max(self._clock, virtual_time)
+        self._virtual_time[priority_class] = virtual_time + 1 / self.weights[priority_class]
+        self.served[priority_class] += 1
+        self._in_flight += 1
+
+    async def acquire(self, priority_class: str):
+        waiters = self._waiters[priority_class]
+
+        if self._in_flight < self.budget and not any(self._waiters.values()):
+            self._charge(priority_class)
+            return None
+
+        # Waiting class rejoins at current virtual time as well
+        if not waiters:
+            self._virtual_time[priority_class] = max(self._virtual_time[priority_class], self._clock)
+
+        future = asyncio.get_running_loop().create_future()
+        waiters.append(future)
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            elif future in waiters:
+                waiters.remove(future)
+            raise
+
+    def release(self):
+        self._in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._in_flight < self.budget:
+            candidates = [name for name, waiters in self._waiters.items() if waiters]
+            if not candidates:
+                return None
+
+            priority_class = min(candidates, key=self._virtual_time.__getitem__)
+            future = self._waiters[priority_class].popleft()
+            if future.cancelled():
+                continue
+
+            self._charge(priority_class)
+            future.set_result(None)
+
+    def slot(self, priority_class: str):
+        return _SchedulerSlot(self, priority_class)
+
+
+class _SchedulerSlot:
+    def __init__(self, scheduler: WeightedFairScheduler, priority_class: str) -> None:
+        self.scheduler = scheduler
+        self.priority_class = priority_class
+
+    async def __aenter__(self):
+        await self.scheduler.acquire(self.priority_class)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.scheduler.release()
@@ -0,0 +1,220 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+from logging import getLogger
+from multiprocessing.process import BaseProcess
+from time import monotonic, sleep
+from typing import TYPE_CHECKING, Any
+
+from core.plugins.plugin_injector import PluginInjector
+from core.registries.service import ServiceRegistry
+from core.types import ControllerModule
+from plugins.microservices._core.backend_loader import initialize_channels, initialize_waypoints, load_backends, prepare_channels
+from plugins.microservices._core.consume_executor import ConsumeExecutor
+from plugins.microservices.redis.cache import invalidators, near_caches, stop_invalidators
+from plugins.microservices.redis.engine import RedisEngine
+from plugins.microservices.redis.singleton import RedisEngineSingleton
+from plugins.microservices.types.channels import ControllerChannel
+from plugins.microservices.types.config import MainConfig
+from plugins.microservices.types.connections import LiveConnections
+
+if TYPE_CHECKING:
+    from plugins.microservices.types.http_waypoint import HTTPWaypoint
+
+
+def worker_connections(config: MainConfig, worker_index: int):
+    # NOTE: Spill file has a single writer, so every worker gets its own one next to parent's
+    connections = {}
+    for name, connection in config["connections"].items():
+        if (outbox := connection.get("outbox", None)) and outbox.get("spill_path", None):
+            connection = {**connection, "outbox": {**outbox, "spill_path": f"{outbox['spill_path']}.worker-{worker_index}"}}
+
+        connections[name] = connection
+
+    return connections
+
+
+def assign_channels(_channels: dict[str, tuple[ControllerChannel, ControllerModule]], worker_index: int,
+                    default_processes: int):
+    # NOTE: Worker `i` consumes every channel which asked for more than `i` processes, so worker 0 runs all of them
+    return {name: channel for name, channel in _channels.items()
+            if worker_index < (channel[0].consumer_processes or default_processes)}
+
+
+async def run_consumer_worker(worker_index: int, config: MainConfig, controllers: dict[str, ControllerModule],
+                              default_processes: int, injector: PluginInjector, waypoints: list["HTTPWaypoint"] | None = None):
+    logger = getLogger("ascender-plugins")
+    stop_event = asyncio.Event()
+
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop_event.set)
+
+    live_connections = await load_backends(worker_connections(config, worker_index))
+    live_connections.select_default(config["default_connection"])
+    ServiceRegistry().add_singletone(LiveConnections, live_connections)
+
+    # NOTE: Forked singleton still points to parent's engine, which has no connections in this process.
+    # Same goes for near-caches, whose invalidation tasks belong to parent's loop
+    RedisEngineSingleton._instance = None
+    near_caches.clear()
+    invalidators.clear()
+    RedisEngineSingleton(RedisEngine(live_connections))
+
+    consume_executor = ConsumeExecutor.from_config(live_connections, config)
+
+    _channels = assign_channels(await prepare_channels(live_connections, controllers), worker_index, default_processes)
+    await initialize_channels(consume_executor, _channels)
+
+    # Handlers resolve the same services as in single-process mode
+    if waypoints is not None:
+        initialize_waypoints(waypoints, injector)
+    injector.unleash_update()
+    logger.info(f"Consumer worker #{worker_index} (pid {os.getpid()}) is consuming {len(_channels)} channels")
+
+    await stop_event.wait()
+
+    await consume_executor.drain()
+    consume_executor.close_channels()
+    await stop_invalidators()
+    for _, live_connection in live_connections.items():
+        await live_connection.disconnect()
+
+
+def _worker_entrypoint(*args):
+    asyncio.run(run_consumer_worker(*args))
+
+
+class ConsumerSupervisor:
+    def __init__(self, config: MainConfig, controllers: dict[str, ControllerModule], injector: PluginInjector, *,
+                 waypoints: list["HTTPWaypoint"] | None = None,
+                 default_processes: int = 1,
+                 restart_delay: float = 1.0,
+                 shutdown_timeout: float = 30.0) -> None:
+        self.config = config
+        self.controllers = controllers
+        self.injector = injector
+        self.waypoints = waypoints
+        self.default_processes = default_processes
+        self.restart_delay = restart_delay
+        self.shutdown_timeout = shutdown_timeout
+
+        self.logger = getLogger("ascender-plugins")
+        self.workers: dict[int, BaseProcess] = {}
+        self.restarts: dict[int, int] = {}
+
+        # NOTE: Workers inherit loaded controllers & DI registry from parent, so they have to be forked.
+        # They aren't daemonic, as process pool executors of channels spawn their own children
+        self._context = multiprocessing.get_context("fork")
+        self._helper: BaseProcess | None = None
+        self._monitor: asyncio.Task | None = None
+        self._stopping = False
+
+        self.check_queues()
+
+    def controller_channels(self) -> list[ControllerChannel]:
+        return [controller_channel for config in self.controllers.values()
+                for controller_channel in config.get("plugin_configs", {}).get("microservices", None) or []]
+
+    def check_queues(self):
+        # NOTE: Workers share load only through one named queue, server-named queue is declared per worker
+        # and every worker would receive its own copy of each message
+        for controller_channel in self.controller_channels():
+            if not (controller_channel.queue and controller_channel.queue.name):
+                raise ValueError(f"Channel {controller_channel.channel.__name__} requires explicitly named `queue` "
+                                 "to be consumed by supervisor workers")
+
+    def worker_count(self):
+        counts = [controller_channel.consumer_processes or self.default_processes
+                  for controller_channel in self.controller_channels()]
+        return max(counts, default=0)
+
+    def spawn(self, worker_index: int):
+        process = self._context.Process(target=_worker_entrypoint,
+                                        args=(worker_index, self.config, self.controllers, self.default_processes,
+                                              self.injector, self.waypoints),
+                                        name=f"ascender-consumer-{worker_index}",
+                                        daemon=False)
+        process.start()
+        self.workers[worker_index] = process
+        return process
+
+    def start(self):
+        # NOTE: Workers are (re)started by helper forked before any connection is opened. It never runs an event loop,
+        # so restarted worker doesn't inherit sockets & loop state of the serving process
+        self._helper = self._context.Process(target=self.supervise, name="ascender-consumer-supervisor", daemon=False)
+        self._helper.start()
+        self._monitor = asyncio.create_task(self.monitor())
+
+    def supervise(self):
+        # Inherited wakeup fd belongs to parent's loop, signals of the helper shouldn't be delivered there
+        signal.set_wakeup_fd(-1)
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self._request_stop)
+
+        for worker_index in range(self.worker_count()):
+            self.spawn(worker_index)
+
+        self.logger.info(f"Consumer supervisor (pid {os.getpid()}) started {len(self.workers)} worker processes")
+
+        while not self._stopping:
+            sleep(self.restart_delay)
+
+            for worker_index, process in list(self.workers.items()):
+                if process.is_alive() or self._stopping:
+                    continue
+
+                self.restarts[worker_index] = self.restarts.get(worker_index, 0) + 1
+                self.logger.warning(f"Consumer worker #{worker_index} exited with code {process.exitcode}, "
+                                    f"restarting (restart #{self.restarts[worker_index]})")
+                process.close()
+                self.spawn(worker_index)
+
+        self.terminate_workers()
+
+    def _request_stop(self, signum: int, frame: Any):
+        self._stopping = True
+
+    def terminate_workers(self):
+        for process in self.workers.values():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+        deadline = monotonic() + self.shutdown_timeout
+        for worker_index, process in self.workers.items():
+            process.join(max(deadline - monotonic(), 0))
+
+            if process.is_alive():
+                self.logger.warning(f"Consumer worker #{worker_index} didn't stop in {self.shutdown_timeout}s, killing it")
+                process.kill()
+                process.join()
+
+    async def monitor(self):
+        while not self._stopping:
+            await asyncio.sleep(self.restart_delay)
+
+            if not self._helper.is_alive() and not self._stopping:
+                self.logger.error(f"Consumer supervisor exited with code {self._helper.exitcode}, "
+                                  "consumer workers aren't restarted anymore")
+                return None
+
+    async def stop(self):
+        self._stopping = True
+        if self._monitor:
+            self._monitor.cancel()
+
+        if self._helper is None:
+            return None
+
+        if self._helper.is_alive():
+            os.kill(self._helper.pid, signal.SIGTERM)
+
+        # Helper gives workers `shutdown_timeout` to drain, so it's awaited a bit longer
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._helper.join, self.shutdown_timeout + self.restart_delay + 5)
+
+        if self._helper.is_alive():
+            self.logger.warning("Consumer supervisor didn't stop in time, killing it")
+            self._helper.kill()
+            await loop.run_in_executor(None, self._helper.join)
@@ -0,0 +1,84 @@
+from typing import Awaitable, Callable
+
+from aio_pika.abc import AbstractChannel, AbstractExchange, AbstractQueue
+from aio_pika.exceptions import ChannelNotFoundEntity
+
+from plugins.microservices.types.modules import RQControllerExchanger, RQControllerQueue
+
+
+class TopologyCache:
+    def __init__(self) -> None:
+        self.exchanges: dict[str, RQControllerExchanger] = {}
+        self.queues: dict[str, RQControllerQueue] = {}
+        self.bindings: set[tuple[str, str, str | None]] = set()
+
+    async def exchange(self, channel: AbstractChannel, exchanger: RQControllerExchanger) -> AbstractExchange:
+        if exchanger.name in self.exchanges:
+            return await channel.get_exchange(exchanger.name, ensure=False)
+
+        _exchange = await exchanger.build(channel)
+        self.exchanges[exchanger.name] = exchanger
+        return _exchange
+
+    async def queue(self, channel: AbstractChannel, queue: RQControllerQueue) -> AbstractQueue:
+        # NOTE: Server-named queues are unique per declaration, so they are never served from cache
+        if queue.name and queue.name in self.queues:
+            return await channel.get_queue(queue.name, ensure=False)
+
+        _queue = await queue.declare(channel)
+        self.queues[_queue.name] = queue
+        return _queue
+
+    async def bind(self, queue: AbstractQueue, exchange: AbstractExchange, routing_key: str | None = None):
+        binding = (queue.name, exchange.name, routing_key)
+        if binding in self.bindings:
+            return None
+
+        await queue.bind(exchange, routing_key=routing_key)
+        self.bindings.add(binding)
+
+    async def exists(self, open_channel: Callable[[], Awaitable[AbstractChannel]], queue_name: str):
+        # NOTE: Failed passive declaration closes the channel, so it's probed on a throwaway one
+        channel = await open_channel()
+        try:
+            await channel.declare_queue(queue_name, passive=True)
+            return True
+        except ChannelNotFoundEntity:
+            return False
+        finally:
+            if not channel.is_closed:
+                await channel.close()
+
+    async def replay(self, channel: AbstractChannel, open_channel: Callable[[], Awaitable[AbstractChannel]]) -> dict[str, str]:
+        for exchanger in self.exchanges.values():
+            if exchanger.name:
+                await exchanger.build(channel)
+
+        renamed: dict[str, str] = {}
+        for name, queue in list(self.queues.items()):
+            # NOTE: Server-named queue which outlived the connection is reused, otherwise it would stay bound
+            # and keep collecting messages without consumer. Gone one can't be redeclared under `amq.gen-*` name,
+            # broker hands out a new one
+            if not queue.name and await self.exists(open_channel, name):
+                continue
+
+            _queue = await queue.declare(channel)
+            if _queue.name != name:
+                renamed[name] = _queue.name
+                self.queues[_queue.name] = self.queues.pop(name)
+
+        self.bindings = {(renamed.get(queue_name, queue_name), exchange_name, routing_key)
+                         for queue_name, exchange_name, routing_key in self.bindings}
+
+        for queue_name, exchange_name, routing_key in self.bindings:
+            _queue = await channel.get_queue(queue_name, ensure=False)
+            await _queue.bind(exchange_name, routing_key=routing_key)
+
+        return renamed
+
+    def report(self):
+        return {
+            "exchanges": sorted(self.exchanges),
+            "queues": sorted(self.queues),
+            "bindings": sorted(self.bindings, key=lambda binding: tuple(part or "" for part in binding)),
+        }
@@ -0,0 +1,54 @@
+import inspect
+import os
+import pickle
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Literal
+
+from plugins.microservices.exceptions.executors import UnshippableHandlerError
+
+
+def build_worker_pool(kind: Literal["process", "thread"], workers: int) -> Executor:
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ascender-channel")
+
+    raise ValueError(f"Unknown channel executor {kind!r}, expected 'process' or 'thread'")
+
+
+def resolve_work(channel: object, kind: Literal["process", "thread"]) -> Callable[..., Any]:
+    channel_type = type(channel)
+    _work = inspect.getattr_static(channel_type, "work", None)
+
+    if _work is None:
+        raise UnshippableHandlerError(f"{channel_type.__name__} should implement synchronous `work` to run in {kind} pool")
+
+    work = getattr(channel, "work")
+    if inspect.iscoroutinefunction(work):
+        raise UnshippableHandlerError(f"{channel_type.__name__}.work should be synchronous, coroutines can't run in {kind} pool")
+
+    if kind == "thread":
+        return work
+
+    # NOTE: Bound methods would drag the channel instance (and its injected services) into every worker
+    if not isinstance(_work, (staticmethod, classmethod)):
+        raise UnshippableHandlerError(f"{channel_type.__name__}.work should be @staticmethod or @classmethod to run in process pool")
+
+    ensure_shippable(channel_type, work, "work method")
+    return work
+
+
+def ensure_shippable(channel_type: type, obj: Any, kind_name: str):
+    if obj is None or obj is inspect.Parameter.empty:
+        return None
+
+    try:
+        pickle.dumps(obj)
+    except Exception as e:
+        raise UnshippableHandlerError(f"{channel_type.__name__} {kind_name} can't be pickled for process pool, "
+                                      "make sure it's defined at module level") from e
+
+
+def default_workers():
+    return os.cpu_count() or 1
@@ -1,9 +1,19 @@
-import json
-from typing import Any, Optional
+import asyncio
+import random
+from logging import getLogger
+from typing import Any, Callable, Iterable, Optional
 from aio_pika import Message, connect
 from pydantic import BaseModel
 
-from plugins.microservices.types.config import RabbitMQConnection
+from plugins.microservices._core.channel_pool import ChannelPool
+from plugins.microservices._core.consumers import ConsumerRegistration
+from plugins.microservices._core.outbox import PublishOutbox
+from plugins.microservices._core.pipeline import pipelined_publish
+from plugins.microservices._core.publisher_pool import PublisherPool
+from plugins.microservices._core.rpc import RPCClient
+from plugins.microservices._core.topology import TopologyCache
+from plugins.microservices.serialization.codecs import codec_registry
+from plugins.microservices.types.config import OutboxConfig, RabbitMQConnection
 
 
 class RabbitMQDriver:
@@ -12,21 +22,118 @@ class RabbitMQDriver:
                  host: str = "localhost",
                  port: int = 5672,
                  login: str = "guest",
-                 password: str = "guest") -> None:
+                 password: str = "guest",
+                 channels_per_connection: int = 4,
+                 publisher_channels: int = 4,
+                 publisher_connections: int = 1,
+                 outbox: OutboxConfig | None = None,
+                 reconnect_delay: float = 0.5,
+                 reconnect_max_delay: float = 30.0) -> None:
         self.url = url
         self.host = host
         self.port = port
         self.login = login
         self.password = password
+        self.reconnect_delay = reconnect_delay
+        self.reconnect_max_delay = reconnect_max_delay
 
+        self.logger = getLogger("ascender-plugins")
         self.connection = None
+        self.channel_pool = ChannelPool(self, channels_per_connection)
+        self.topology = TopologyCache()
+        self.publisher_pool = PublisherPool(self, publisher_channels, connections=publisher_connections)
+        self.rpc = RPCClient(self)
+        self.outbox = PublishOutbox(self, **outbox) if outbox is not None else None
+        self.consumers: list[ConsumerRegistration] = []
+
+        self.reconnects = 0
+        self._closing = False
+        self._reconnecting: asyncio.Task | None = None
+
+    async def open_connection(self):
+        return await connect(self.url,
+                             host=self.host, port=self.port,
+                             login=self.login, password=self.password)
 
     async def connect(self):
-        self.connection = await connect(self.url,
-                                        host=self.host, port=self.port,
-                                        login=self.login, password=self.password)
+        self.connection = await self.open_connection()
+        self.connection.close_callbacks.add(self._on_connection_close)
+
+        if self.outbox:
+            self.outbox.start()
+
+    @property
+    def healthy(self):
+        return (not self._closing and self._reconnecting is None
+                and self.connection is not None and not self.connection.is_closed)
+
+    def _on_connection_close(self, sender: Any, exc: BaseException | None = None):
+        if self._closing or self._reconnecting is not None:
+            return None
+
+        self.logger.warning(f"Connection to RabbitMQ {self.host}:{self.port} was lost: {exc}, reconnecting...")
+        self._reconnecting = asyncio.create_task(self.reconnect())
+
+    async def _open_with_backoff(self):
+        delay = self.reconnect_delay
+        while True:
+            try:
+                return await self.open_connection()
+            except Exception as e:
+                # Full jitter, so consumer processes of one deployment don't reconnect in lockstep after failover
+                wait = random.uniform(0, delay)
+                self.logger.warning(f"Reconnect to RabbitMQ {self.host}:{self.port} failed: {e}, retrying in {wait:.2f}s")
+                await asyncio.sleep(wait)
+                delay = min(delay * 2, self.reconnect_max_delay)
+
+    async def reconnect(self):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+
+        try:
+            while True:
+                self.connection = await self._open_with_backoff()
+                self.connection.close_callbacks.add(self._on_connection_close)
+
+                try:
+                    await self.restore()
+                    break
+                except Exception as e:
+                    self.logger.warning(f"Failed to restore RabbitMQ topology after reconnect: {e}, retrying...")
+                    if not self.connection.is_closed:
+                        await self.connection.close()
+                    await asyncio.sleep(self.reconnect_delay)
+
+            self.reconnects += 1
+            self.logger.info(f"Reconnected to RabbitMQ {self.host}:{self.port} in {loop.time() - started:.2f}s, "
+                             f"restored {len(self.topology.queues)} queues & {len(self.consumers)} consumers")
+        finally:
+            self._reconnecting = None
+
+    async def restore(self):
+        # Channels of the dead connection are dropped, pools reopen them lazily on the new one
+        await self.channel_pool.close()
+        await self.publisher_pool.close()
+
+        # NOTE: Topology is replayed from cache instead of re-running channel preparation of the plugin
+        async with await self.generate_channel() as channel:
+            renamed = await self.topology.replay(channel, self.generate_channel)
+
+        for consumer in self.consumers:
+            await consumer.restore(self, renamed)
 
     async def disconnect(self):
+        self._closing = True
+        if self._reconnecting is not None:
+            self._reconnecting.cancel()
+            await asyncio.gather(self._reconnecting, return_exceptions=True)
+
+        if self.outbox:
+            await self.outbox.close()
+
+        await self.rpc.close()
+        await self.publisher_pool.close()
+        await self.channel_pool.close()
         await self.connection.close()
 
     async def generate_channel(self, num: int | None = None):
@@ -34,27 +141,57 @@ class RabbitMQDriver:
 
     async def publish(self, body: Any | BaseModel, *, channel_id: int | None = None,
                       exchange: str = "",
-                      routing_key: str = ""):
-        channel = await self.generate_channel(channel_id)
+                      routing_key: str = "",
+                      content_type: str | None = None):
+        codec = codec_registry.get(content_type)
+        message = Message(codec.serialize(body), content_type=codec.content_type)
+
+        if channel_id is not None:
+            async with await self.generate_channel(channel_id) as channel:
+                _exchange = await channel.get_exchange(exchange) if exchange != "" else channel.default_exchange
+                return await _exchange.publish(message, routing_key=routing_key)
+
+        async with self.publisher_pool.channel() as (slot, _):
+            _exchange = await self.publisher_pool.exchange(slot, exchange)
+            return await _exchange.publish(message, routing_key=routing_key)
+
+
+    def publish_later(self, body: Any | BaseModel, *,
+                      exchange: str = "",
+                      routing_key: str = "",
+                      content_type: str | None = None):
+        if not self.outbox:
+            raise RuntimeError("Connection has no `outbox` configured")
+
+        codec = codec_registry.get(content_type)
+        self.outbox.enqueue(exchange, routing_key, codec.serialize(body), {"content_type": codec.content_type})
+
+    async def publish_many(self, bodies: Iterable[Any | BaseModel], *,
+                           exchange: str = "",
+                           routing_key: str = "",
+                           key_fn: Callable[[Any], str] | None = None,
+                           content_type: str | None = None,
+                           window: int = 256):
+        if routing_key and key_fn:
+            raise ValueError("Either `routing_key` or `key_fn` should be passed, not both")
+
+        codec = codec_registry.get(content_type)
+        encoded = [(codec.serialize(body), key_fn(body) if key_fn else routing_key) for body in bodies]
 
-        _exchange = await channel.get_exchange(exchange) if exchange != "" else channel.default_exchange
+        async def publish(item: tuple[bytes, str]):
+            async with self.publisher_pool.channel() as (slot, _):
+                _exchange = await self.publisher_pool.exchange(slot, exchange)
+                return await _exchange.publish(Message(item[0], content_type=codec.content_type), routing_key=item[1])
 
-        if isinstance(body, BaseModel):
-            body = body.model_dump_json()
+        return await pipelined_publish(encoded, publish, window=window, stop_on_failure=False)
 
-        if not isinstance(body, (str, bytes)):
-            body = json.dumps(
-                body,
-                ensure_ascii=False,
-                allow_nan=False,
-                indent=None,
-                separators=(",", ":"),
-            ).encode("utf-8")
 
-        if not isinstance(body, bytes):
-            body = body.encode("utf-8")
-        
-        return await _exchange.publish(Message(body), routing_key=routing_key)
+    async def call(self, exchange: str, routing_key: str, body: Any | BaseModel,
+                   timeout: float | None = 30.0, *,
+                   content_type: str | None = None,
+                   response_model: type | None = None):
+        return await self.rpc.call(exchange, routing_key, body, timeout=timeout,
+                                   content_type=content_type, response_model=response_model)
 
 
 async def initialize(connection: RabbitMQConnection):
@@ -63,9 +200,21 @@ async def initialize(connection: RabbitMQConnection):
     _port = connection.get("port", 5672)
     _login = connection.get("login", "guest")
     _password = connection.get("password", "guest")
+    _channels_per_connection = connection.get("channels_per_connection", 4)
+    _publisher_channels = connection.get("publisher_channels", 4)
+    _publisher_connections = connection.get("publisher_connections", 1)
+    _outbox = connection.get("outbox", None)
+    _reconnect_delay = connection.get("reconnect_delay", 0.5)
+    _reconnect_max_delay = connection.get("reconnect_max_delay", 30.0)
 
     driver = RabbitMQDriver(
-        url, host=_host, password=_password, port=_port, login=_login)
+        url, host=_host, password=_password, port=_port, login=_login,
+        channels_per_connection=_channels_per_connection,
+        publisher_channels=_publisher_channels,
+        publisher_connections=_publisher_connections,
+        outbox=_outbox,
+        reconnect_delay=_reconnect_delay,
+        reconnect_max_delay=_reconnect_max_delay)
 
     await driver.connect()
     return driver
@@ -1,5 +1,8 @@
 from typing import Optional
 from redis.asyncio import Redis
+from redis.asyncio.retry import Retry
+from redis.backoff import EqualJitterBackoff
+from redis.exceptions import ConnectionError, TimeoutError
 
 from plugins.microservices.types.config import RedisConnection
 
@@ -10,25 +13,43 @@ class RedisDriver:
                  host: str = "localhost",
                  port: int = 6379,
                  password: Optional[str] = None,
-                 db: str | int = 0) -> None:
+                 db: str | int = 0,
+                 retries: int = 5,
+                 reconnect_delay: float = 0.1,
+                 reconnect_max_delay: float = 5.0,
+                 health_check_interval: float = 15.0) -> None:
         self.url = url
         self.host = host
         self.port = port
         self.password = password
         self.db = db
+        self.retries = retries
+        self.reconnect_delay = reconnect_delay
+        self.reconnect_max_delay = reconnect_max_delay
+        self.health_check_interval = health_check_interval
 
         self.connection = None
 
+    def _recovery_options(self):
+        # NOTE: Pooled connections are re-established transparently, failed command is retried with backoff
+        # instead of surfacing the blip, idle connections are health-checked before reuse
+        return {
+            "retry": Retry(EqualJitterBackoff(cap=self.reconnect_max_delay, base=self.reconnect_delay), self.retries),
+            "retry_on_error": [ConnectionError, TimeoutError],
+            "health_check_interval": self.health_check_interval,
+        }
+
     async def connect(self):
         if self.url:
-            self.connection = await Redis.from_url(self.url)
+            self.connection = await Redis.from_url(self.url, **self._recovery_options())
             return
         
         self.connection = await Redis(
             host=self.host,
             port=self.port,
             db=self.db,
-            password=self.password
+            password=self.password,
+            **self._recovery_options()
         )
 
     async def disconnect(self):
@@ -53,9 +74,17 @@ async def initialize(connection: RedisConnection):
     _port = connection.get("port", 6379)
     _password = connection.get("password", None)
     _db = connection.get("db", 0)
+    _retries = connection.get("retries", 5)
+    _reconnect_delay = connection.get("reconnect_delay", 0.1)
+    _reconnect_max_delay = connection.get("reconnect_max_delay", 5.0)
+    _health_check_interval = connection.get("health_check_interval", 15.0)
 
     driver = RedisDriver(
-        url, host=_host, password=_password, port=_port, db=_db)
+        url, host=_host, password=_password, port=_port, db=_db,
+        retries=_retries,
+        reconnect_delay=_reconnect_delay,
+        reconnect_max_delay=_reconnect_max_delay,
+        health_check_interval=_health_check_interval)
 
     await driver.connect()
     return driver
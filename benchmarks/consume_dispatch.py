@@ -0,0 +1,88 @@
+"""
+Microbenchmark of the consume hot path: per-message signature introspection (legacy)
+versus the dispatch plan compiled once in `ControllerChannel.define_channel`.
+
+Run from the Ascender Framework project root:
+    python -m plugins.microservices.benchmarks.consume_dispatch
+"""
+import asyncio
+import inspect
+from time import perf_counter
+
+from pydantic import BaseModel
+
+from plugins.microservices.parsers.consume_handle import ConsumeHandleParser
+
+
+class OrderDTO(BaseModel):
+    id: int
+    customer: str
+    items: list[str]
+    total: float
+
+
+class OrderChannel:
+    async def handle(self, ctx: object, body: OrderDTO):
+        pass
+
+
+class LegacyConsumeHandleParser:
+    def __init__(self, handle_method) -> None:
+        self.handle_method = handle_method
+
+    def get_parameters(self):
+        obj_args = inspect.signature(self.handle_method).parameters
+
+        body = None
+        for name, abstract in obj_args.items():
+            abstract = abstract.annotation
+            if name in ["body", "dto", "content"]:
+                body = abstract
+        return body
+
+    def __call__(self, data):
+        _body = self.get_parameters()
+        if not _body:
+            return None
+
+        return _body.model_validate_json(data)
+
+
+async def run_legacy(channel: OrderChannel, messages: list[bytes]):
+    for message in messages:
+        parser = LegacyConsumeHandleParser(channel.handle)
+        payload = [None]
+        if body := parser(message.decode()):
+            payload.append(body)
+        await channel.handle(*payload)
+
+
+async def run_compiled(channel: OrderChannel, messages: list[bytes]):
+    parser = ConsumeHandleParser(channel.handle)
+    for message in messages:
+        payload = [None]
+        if parser.accepts_body:
+            payload.append(parser(message))
+        await channel.handle(*payload)
+
+
+def measure(runner, channel: OrderChannel, messages: list[bytes]) -> float:
+    start = perf_counter()
+    asyncio.run(runner(channel, messages))
+    return len(messages) / (perf_counter() - start)
+
+
+def main(count: int = 100_000):
+    channel = OrderChannel()
+    messages = [OrderDTO(id=i, customer=f"customer-{i}", items=["a", "b", "c"], total=i * 1.5).model_dump_json().encode()
+                for i in range(count)]
+
+    legacy = measure(run_legacy, channel, messages)
+    compiled = measure(run_compiled, channel, messages)
+
+    print(f"legacy:   {legacy:>12,.0f} msg/s")
+    print(f"compiled: {compiled:>12,.0f} msg/s ({compiled / legacy:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
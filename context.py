@@ -1,16 +1,32 @@
-import json
 from typing import TYPE_CHECKING, Any, AsyncIterable, Literal
 from aio_pika import IncomingMessage, Message, Exchange
+from aiormq import spec
 from pydantic import BaseModel
 
+from plugins.microservices._core.pipeline import pipelined_publish
+from plugins.microservices.serialization.codecs import Codec, codec_registry
+
 if TYPE_CHECKING:
     from plugins.microservices.handler import Channel
+    from plugins.microservices.types.publication import PublicationResult
+    from plugins.microservices.types.retry import RetryPolicy
+
+
+def with_content_type(properties: spec.Basic.Properties | None, codec: Codec) -> spec.Basic.Properties:
+    if properties is None:
+        return spec.Basic.Properties(content_type=codec.content_type)
+
+    if not properties.content_type:
+        properties.content_type = codec.content_type
+
+    return properties
 
 
 class CommonContext:
     def __init__(self, body: Any | BaseModel, body_encoded: bytes,
                  delivery_frame: Literal["Basic.Ack", "Basic.Nack", "Basic.Reject"],
-                 routing_key: str, exchanger: Exchange, channel: "Channel", **publication_params) -> None:
+                 routing_key: str, exchanger: Exchange, channel: "Channel",
+                 content_type: str | None = None, **publication_params) -> None:
         self.body = body
         self.body_encoded = body_encoded
         self.delivery_frame = delivery_frame
@@ -18,31 +34,32 @@ class CommonContext:
         self.exchanger = exchanger
         self.exchange = self.exchanger.name
         self.channel = channel
+        self.content_type = content_type
+        self.publication_params = publication_params
     
-    async def retry(self, mandatory: bool = False, immediate: bool = False, timeout: float | int | None = None):
-        if isinstance(body, BaseModel):
-            body = body.model_dump_json()
-
-        if not isinstance(body, (str, bytes)):
-            body = json.dumps(
-                body,
-                ensure_ascii=False,
-                allow_nan=False,
-                indent=None,
-                separators=(",", ":"),
-            ).encode("utf-8")
-
-        if not isinstance(body, bytes):
-            body = body.encode("utf-8")
-        
-        return await self.exchanger.publish(Message(self.body_encoded), self.routing_key, mandatory=mandatory, immediate=immediate, timeout=timeout)
+    async def retry(self, mandatory: bool | None = None, immediate: bool | None = None, timeout: float | int | None = None):
+        return await self.exchanger.publish(Message(self.body_encoded, content_type=self.content_type), self.routing_key,
+                                            mandatory=self.publication_params.get("mandatory", False) if mandatory is None else mandatory,
+                                            immediate=self.publication_params.get("immediate", False) if immediate is None else immediate,
+                                            timeout=timeout or self.publication_params.get("timeout", None))
 
 
 class MessageContext:
-    def __init__(self, message: IncomingMessage, exchanger: Exchange, channel: "Channel") -> None:
+    def __init__(self, message: IncomingMessage, exchanger: Exchange, channel: "Channel", *,
+                 retry_policy: "RetryPolicy | None" = None,
+                 queue_name: str | None = None) -> None:
         self.message = message
         self.exchanger = exchanger
         self.__channel = channel
+        self.retry_policy = retry_policy
+        self.queue_name = queue_name
+
+    @property
+    def attempt(self) -> int:
+        if not self.retry_policy:
+            return 0
+
+        return int((self.message.headers or {}).get(self.retry_policy.attempt_header, 0))
     
     @property
     def ack(self):
@@ -56,23 +73,11 @@ class MessageContext:
     def reject(self):
         return self.message.reject
     
-    async def raw_publish(self, body: Any | BaseModel, *, exchange: str = "", routing_key: str = "", properties: Any | None = None, mandatory: bool = False, immediate: bool = False, timeout: float | int | None = None):
-        if isinstance(body, BaseModel):
-            body = body.model_dump_json()
-
-        if not isinstance(body, (str, bytes)):
-            body = json.dumps(
-                body,
-                ensure_ascii=False,
-                allow_nan=False,
-                indent=None,
-                separators=(",", ":"),
-            ).encode("utf-8")
-
-        if not isinstance(body, bytes):
-            body = body.encode("utf-8")
-
-        delivery = await self.message.channel.basic_publish(body, exchange=exchange, routing_key=routing_key, properties=properties, mandatory=mandatory, immediate=immediate, timeout=timeout)
+    async def raw_publish(self, body: Any | BaseModel, *, exchange: str = "", routing_key: str = "", properties: Any | None = None, content_type: str | None = None, mandatory: bool = False, immediate: bool = False, timeout: float | int | None = None):
+        codec = codec_registry.get(content_type or getattr(properties, "content_type", None))
+        body = codec.serialize(body)
+
+        delivery = await self.message.channel.basic_publish(body, exchange=exchange, routing_key=routing_key, properties=with_content_type(properties, codec), mandatory=mandatory, immediate=immediate, timeout=timeout)
         
         match delivery.name:
             case "Basic.Ack":
@@ -86,23 +91,12 @@ class MessageContext:
         
         return delivery
     
-    async def respond_direct(self, body: Any | BaseModel, routing_key: str = "", immediate: bool = False, timeout: float | int | None = None):
-        if isinstance(body, BaseModel):
-            body = body.model_dump_json()
-
-        if not isinstance(body, (str, bytes)):
-            body = json.dumps(
-                body,
-                ensure_ascii=False,
-                allow_nan=False,
-                indent=None,
-                separators=(",", ":"),
-            ).encode("utf-8")
-
-        if not isinstance(body, bytes):
-            body = body.encode("utf-8")
+    async def respond_direct(self, body: Any | BaseModel, routing_key: str = "", content_type: str | None = None, immediate: bool = False, timeout: float | int | None = None):
+        # NOTE: Replies are encoded the same way as the incoming message, unless overridden
+        codec = codec_registry.get(content_type or self.message.content_type)
+        body = codec.serialize(body)
             
-        delivery = await self.message.channel.basic_publish(body, exchange=self.message.exchange, routing_key=routing_key, immediate=immediate, timeout=timeout)
+        delivery = await self.message.channel.basic_publish(body, exchange=self.message.exchange, routing_key=routing_key, properties=with_content_type(None, codec), immediate=immediate, timeout=timeout)
         match delivery.name:
             case "Basic.Ack":
                 await self.__channel.success(self)
@@ -113,13 +107,69 @@ class MessageContext:
             case "Basic.Reject":
                 await self.__channel.failure(self, "Basic.Reject")
 
-    async def astream_publication_back(self, messages: AsyncIterable[bytes], routing_key: str = "", is_presistant: bool = True):
-        exchange = self.exchanger
+    async def respond(self, body: Any | BaseModel, content_type: str | None = None, timeout: float | int | None = None):
+        if not self.message.reply_to:
+            raise RuntimeError("Message has no `reply_to`, there is no caller to respond to")
 
-        if not is_presistant:
-            async for message in messages:
-                await self.raw_publish(message, exchange=exchange.name, routing_key=routing_key, immediate=True)
-        
+        codec = codec_registry.get(content_type or self.message.content_type)
+        properties = spec.Basic.Properties(content_type=codec.content_type,
+                                           correlation_id=self.message.correlation_id)
+
+        return await self.message.channel.basic_publish(codec.serialize(body), exchange="", routing_key=self.message.reply_to,
+                                                        properties=properties, timeout=timeout)
+
+    async def retry_later(self, delay: float | None = None):
+        # NOTE: Republishes message into delay queue of `ControllerChannel(retry_policy=...)`, which dead-letters it back
+        # to the consumed queue, after the last attempt message is parked. Original delivery is settled by usual acknowledgement flow
+        if not self.retry_policy or not self.queue_name:
+            raise RuntimeError("`retry_later` requires `retry_policy` to be set on ControllerChannel")
+
+        attempt = self.attempt + 1
+        properties = spec.Basic.Properties(content_type=self.message.content_type,
+                                           content_encoding=self.message.content_encoding,
+                                           headers={**(self.message.headers or {}), self.retry_policy.attempt_header: attempt},
+                                           delivery_mode=self.message.delivery_mode,
+                                           correlation_id=self.message.correlation_id,
+                                           reply_to=self.message.reply_to,
+                                           message_id=self.message.message_id,
+                                           type=self.message.type)
+
+        if attempt > self.retry_policy.max_attempts:
+            routing_key = self.retry_policy.parking_queue_name(self.queue_name)
         else:
-            async for message in messages:
-                await self.exchanger.publish(Message(message, delivery_mode=2), routing_key=routing_key, immediate=True)
\ No newline at end of file
+            routing_key = self.retry_policy.retry_queue_name(self.queue_name, attempt)
+            _delay = self.retry_policy.delay(attempt) if delay is None else delay
+            properties.expiration = str(max(int(_delay * 1000), 0))
+
+        return await self.message.channel.basic_publish(self.message.body, exchange="", routing_key=routing_key, properties=properties)
+
+    async def astream_publication_back(self, messages: AsyncIterable[bytes], routing_key: str = "", is_presistant: bool = True,
+                                       window: int | None = None, stop_on_failure: bool = True) -> "PublicationResult | None":
+        exchange = self.exchanger
+
+        if window is None:
+            if not is_presistant:
+                async for message in messages:
+                    await self.raw_publish(message, exchange=exchange.name, routing_key=routing_key, immediate=True)
+            
+            else:
+                async for message in messages:
+                    await self.exchanger.publish(Message(message, delivery_mode=2), routing_key=routing_key, immediate=True)
+            
+            return None
+
+        codec = codec_registry.get()
+        body_params = {"content_type": codec.content_type, **({"delivery_mode": 2} if is_presistant else {})}
+
+        async def publish(message: Any):
+            return await exchange.publish(Message(codec.serialize(message), **body_params), routing_key=routing_key)
+
+        async def on_settled(index: int, message: Any, state: Any):
+            match state:
+                case "Basic.Ack":
+                    await self.__channel.success(self)
+                
+                case "Basic.Nack" | "Basic.Reject":
+                    await self.__channel.failure(self, state)
+
+        return await pipelined_publish(messages, publish, window=window, on_settled=on_settled, stop_on_failure=stop_on_failure)
\ No newline at end of file
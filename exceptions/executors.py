@@ -0,0 +1,2 @@
+class UnshippableHandlerError(Exception):
+    pass
@@ -1,52 +1,58 @@
 from __future__ import annotations
-import json
-from typing import TYPE_CHECKING, Any, AsyncIterable, Literal, final
+from typing import TYPE_CHECKING, Any, AsyncIterable, Callable, Iterable, Literal, final
 
 from aio_pika import Exchange, Message
 from pydantic import BaseModel
 
-
-from core.optionals.base.dto import BaseDTO
-from core.optionals.base.response import BaseResponse
+from plugins.microservices._core.outbox import PublishOutbox
 from plugins.microservices.context import CommonContext
 from plugins.microservices.context import MessageContext
+from plugins.microservices._core.pipeline import pipelined_publish
+from plugins.microservices.serialization.codecs import codec_registry
+from plugins.microservices.serialization.compression import CompressionPolicy
+from plugins.microservices.types.publication import PublicationResult
 
 
 class Channel:
 
     exchange: Exchange
     routing_key: str
+    compression: CompressionPolicy | None = None
+    outbox: PublishOutbox | None = None
     
     async def handle(self, ctx: MessageContext):
         pass
 
+    async def handle_batch(self, ctxs: list[MessageContext], bodies: list[Any]) -> Iterable[MessageContext] | None:
+        # NOTE: Return contexts of failed messages to nack only them, raise to nack the whole batch
+        raise NotImplementedError(f"{self.__class__.__name__} doesn't implement `handle_batch`")
+
+    async def handle_result(self, ctx: MessageContext, result: Any):
+        # NOTE: With `ControllerChannel(executor=...)` the channel implements synchronous `work` taking the parsed body,
+        # it runs in the worker pool and its return value is passed here. For "process" executor it should be
+        # a @staticmethod/@classmethod with picklable body & result
+        pass
+
     async def success(self, ctx: MessageContext):
         pass
 
     async def failure(self, ctx: MessageContext, state: Literal["Basic.Nack", "Basic.Reject"]):
         pass
+
+    async def success_many(self, result: PublicationResult):
+        pass
+
+    async def failure_many(self, result: PublicationResult):
+        pass
     
     @final
-    async def raw_publish(self, body: Any | BaseModel, *, no_cb: bool = False, body_params: dict[str, Any] = {}, routing_key: str = "", mandatory: bool = False, immediate: bool = False, timeout: float | int | None = None):
-        _body = body
-
-        if isinstance(_body, (BaseModel, BaseDTO, BaseResponse)):
-            _body = body.model_dump_json()
-
-        elif not isinstance(_body, (str, bytes)):
-            _body = json.dumps(
-                body,
-                ensure_ascii=False,
-                allow_nan=False,
-                indent=None,
-                separators=(",", ":"),
-            ).encode("utf-8")
-
-        if not isinstance(_body, bytes):
-            _body = _body.encode("utf-8")
-
-        delivery = await self.exchange.publish(Message(_body, **body_params), routing_key=routing_key, mandatory=mandatory, immediate=immediate, timeout=timeout)
-        common_context = CommonContext(body, _body, delivery.name, routing_key, self.exchange, self, **{
+    async def raw_publish(self, body: Any | BaseModel, *, no_cb: bool = False, body_params: dict[str, Any] = {}, routing_key: str = "", content_type: str | None = None, mandatory: bool = False, immediate: bool = False, timeout: float | int | None = None):
+        codec = codec_registry.get(content_type or body_params.get("content_type"))
+        _body = codec.serialize(body)
+        data, params = self._compress(_body, {"content_type": codec.content_type, **body_params})
+
+        delivery = await self.exchange.publish(Message(data, **params), routing_key=routing_key, mandatory=mandatory, immediate=immediate, timeout=timeout)
+        common_context = CommonContext(body, _body, delivery.name, routing_key, self.exchange, self, codec.content_type, **{
             "mandatory": mandatory,
             "immediate": immediate,
             "timeout": timeout,
@@ -54,7 +60,35 @@ class Channel:
         if no_cb:
             return delivery
         
-        match delivery.name:
+        await self._dispatch_delivery(common_context, delivery.name)
+        return delivery
+
+    @final
+    async def publish_later(self, body: Any | BaseModel, *, body_params: dict[str, Any] = {}, routing_key: str = "", content_type: str | None = None):
+        # NOTE: Returns once message is buffered, `success`/`failure` callbacks aren't dispatched for outbox publishes
+        if not self.outbox:
+            await self.raw_publish(body, no_cb=True, body_params=body_params, routing_key=routing_key, content_type=content_type)
+            return None
+
+        codec = codec_registry.get(content_type or body_params.get("content_type"))
+        data, params = self._compress(codec.serialize(body), {"content_type": codec.content_type, **body_params})
+        self.outbox.enqueue(self.exchange.name, routing_key, data, params)
+
+    @final
+    def _compress(self, data: bytes, body_params: dict[str, Any]) -> tuple[bytes, dict[str, Any]]:
+        # NOTE: Explicit `content_encoding` means body is already encoded by caller
+        if not self.compression or body_params.get("content_encoding"):
+            return data, body_params
+
+        data, content_encoding = self.compression.compress(data)
+        if content_encoding:
+            return data, {**body_params, "content_encoding": content_encoding}
+        
+        return data, body_params
+
+    @final
+    async def _dispatch_delivery(self, common_context: CommonContext, state: str):
+        match state:
             case "Basic.Ack":
                 await self.success(common_context)
             
@@ -63,15 +97,73 @@ class Channel:
             
             case "Basic.Reject":
                 await self.failure(common_context, "Basic.Reject")
-        
-        return delivery
     
     @final
-    async def astream_publication(self, messages: AsyncIterable[bytes], routing_key: str = "", is_presistant: bool = True):
-        if not is_presistant:
+    async def astream_publication(self, messages: AsyncIterable[bytes], routing_key: str = "", is_presistant: bool = True,
+                                  window: int | None = None, stop_on_failure: bool = True) -> PublicationResult | None:
+        if window is None:
+            if not is_presistant:
+                async for message in messages:
+                    await self.raw_publish(message, routing_key=routing_key, immediate=True)
+            
+            else:
+                async for message in messages:
+                    await self.raw_publish(message, body_params={"delivery_mode": 2}, routing_key=routing_key, immediate=True)
+            
+            return None
+
+        codec = codec_registry.get()
+        body_params = {"content_type": codec.content_type, **({"delivery_mode": 2} if is_presistant else {})}
+
+        async def encoded():
             async for message in messages:
-                await self.raw_publish(message, routing_key=routing_key, immediate=True)
+                yield message, codec.serialize(message)
+
+        async def publish(item: tuple[Any, bytes]):
+            data, params = self._compress(item[1], body_params)
+            return await self.exchange.publish(Message(data, **params), routing_key=routing_key)
+
+        async def on_settled(index: int, item: tuple[Any, bytes], state: Any):
+            if isinstance(state, BaseException):
+                return None
+
+            await self._dispatch_delivery(CommonContext(item[0], item[1], state, routing_key, self.exchange, self, codec.content_type), state)
+
+        return await pipelined_publish(encoded(), publish, window=window, on_settled=on_settled, stop_on_failure=stop_on_failure)
+
+    @final
+    async def publish_many(self, bodies: Iterable[Any | BaseModel], *, routing_key: str = "",
+                           key_fn: Callable[[Any], str] | None = None,
+                           body_params: dict[str, Any] = {}, content_type: str | None = None,
+                           window: int = 256,
+                           callbacks: Literal["aggregate", "message", "none"] = "aggregate") -> PublicationResult:
+        if routing_key and key_fn:
+            raise ValueError("Either `routing_key` or `key_fn` should be passed, not both")
         
-        else:
-            async for message in messages:
-                await self.raw_publish(message, body_params={"delivery_mode": 2}, routing_key=routing_key, immediate=True)
\ No newline at end of file
+        codec = codec_registry.get(content_type or body_params.get("content_type"))
+        _body_params = {"content_type": codec.content_type, **body_params}
+        
+        # Whole batch is serialized upfront, so publishing loop only awaits confirms
+        encoded = [(body, codec.serialize(body), key_fn(body) if key_fn else routing_key) for body in bodies]
+
+        async def publish(item: tuple[Any, bytes, str]):
+            data, params = self._compress(item[1], _body_params)
+            return await self.exchange.publish(Message(data, **params), routing_key=item[2])
+
+        async def on_settled(index: int, item: tuple[Any, bytes, str], state: Any):
+            if isinstance(state, BaseException):
+                return None
+
+            await self._dispatch_delivery(CommonContext(item[0], item[1], state, item[2], self.exchange, self, codec.content_type), state)
+
+        result = await pipelined_publish(encoded, publish, window=window,
+                                         on_settled=on_settled if callbacks == "message" else None,
+                                         stop_on_failure=False)
+
+        if callbacks == "aggregate":
+            if result.ok:
+                await self.success_many(result)
+            else:
+                await self.failure_many(result)
+
+        return result
\ No newline at end of file
@@ -1,27 +1,67 @@
 import inspect
-from typing import Any, Awaitable, Callable
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, get_args
+
+from pydantic import TypeAdapter
 
 from core.optionals.base.dto import BaseDTO
 
+if TYPE_CHECKING:
+    from plugins.microservices.serialization.codecs import Codec
+
 
 class ConsumeHandleParser:
-    def __init__(self, handle_method: Callable[..., Awaitable[None]]) -> None:
+    body_names = ("body", "dto", "content")
+    batch_body_names = ("bodies",)
+
+    def __init__(self, handle_method: Callable[..., Awaitable[None]], batch: bool = False) -> None:
         self.handle_method = handle_method
-    
-    def get_parameters(self):
-        obj_args = inspect.signature(self.handle_method).parameters
+        self.batch = batch
+
+        # NOTE: Signature is resolved once per channel, hot path only validates & calls
+        self.body_name, self.body_type = self.get_parameters()
+
+        if self.batch:
+            # `bodies: list[SomeDTO]` is validated item by item, as every message arrives separately
+            self.body_type = (get_args(self.body_type) or (Any,))[0] if self.body_name else Any
+            self.validator, self.python_validator = self.compile_validators(self.body_type)
         
-        body: BaseDTO | None = None
+        else:
+            self.validator, self.python_validator = self.compile_validators(self.body_type) if self.body_name else (None, None)
+
+    @property
+    def accepts_body(self) -> bool:
+        return self.validator is not None
+
+    def get_parameters(self) -> tuple[str | None, type[BaseDTO] | Any | None]:
+        try:
+            obj_args = inspect.signature(self.handle_method, eval_str=True).parameters
+        except NameError:
+            obj_args = inspect.signature(self.handle_method).parameters
+
+        body_names = self.batch_body_names if self.batch else self.body_names
         for name, abstract in obj_args.items():
-            # abstract: inspect.Parameter = abstract
-            abstract = abstract.annotation
-            if name in ["body", "dto", "content"]:
-                body = abstract
-        return body
-
-    def __call__(self, data: Any) -> Any:
-        _body = self.get_parameters()
-        if not _body:
+            if name in body_names:
+                return name, abstract.annotation
+
+        return None, None
+
+    @staticmethod
+    def compile_validators(body_type: Any) -> tuple[Callable[[str | bytes], Any], Callable[[Any], Any]]:
+        if body_type is inspect.Parameter.empty:
+            body_type = Any
+
+        # Pydantic models carry their own compiled validator, everything else goes through `TypeAdapter`
+        if isinstance(body_type, type) and hasattr(body_type, "model_validate_json"):
+            return body_type.model_validate_json, body_type.model_validate
+
+        adapter = TypeAdapter(body_type)
+        return adapter.validate_json, adapter.validate_python
+
+    def __call__(self, data: str | bytes, codec: "Codec | None" = None) -> Any:
+        if not self.validator:
             return None
-        
-        return _body.model_validate_json(data)
\ No newline at end of file
+
+        if codec is None or codec.json_compatible:
+            return self.validator(data)
+
+        return self.python_validator(codec.decode(data))
@@ -0,0 +1,52 @@
+"""
+One-off rebuild of RedisEntity id & secondary indexes for data written before they existed.
+
+Run from the Ascender Framework project root:
+    python -m plugins.microservices.redis.backfill --url redis://localhost:6379/0 entities.users:UserEntity ...
+"""
+import argparse
+import asyncio
+from importlib import import_module
+
+from plugins.microservices.backends.redis import RedisDriver
+from plugins.microservices.redis.engine import RedisEngine
+from plugins.microservices.redis.singleton import RedisEngineSingleton
+from plugins.microservices.types.connections import LiveConnections
+
+
+def load_entity(path: str):
+    module, _, name = path.partition(":")
+    return getattr(import_module(module), name)
+
+
+async def main(url: str, entities: list[str], chunk_size: int):
+    driver = RedisDriver(url)
+    await driver.connect()
+
+    # NOTE: Every entity is backfilled over the given url, regardless of connection name it's bound to
+    live_connections = LiveConnections(default=driver)
+    live_connections.select_default("default")
+
+    _entities = [load_entity(path) for path in entities]
+    for entity in _entities:
+        if entity._connection.default:
+            live_connections[entity._connection.default] = driver
+
+    RedisEngineSingleton(RedisEngine(live_connections, chunk_size))
+
+    try:
+        for entity in _entities:
+            total = await entity.rebuild_index()
+            print(f"{entity.__name__} ({entity._entityname.default}): indexed {total} entities")
+    finally:
+        await driver.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild RedisEntity indexes")
+    parser.add_argument("--url", required=True, help="Redis connection url")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("entities", nargs="+", help="Entity classes as `module.path:ClassName`")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.url, args.entities, args.chunk_size))
@@ -0,0 +1,194 @@
+import asyncio
+from collections import OrderedDict
+from logging import getLogger
+from time import monotonic
+from typing import Any
+
+from plugins.microservices.backends.redis import RedisDriver
+
+
+class NearCache:
+    def __init__(self, size: int = 1024, ttl: float = 30.0) -> None:
+        if size < 1:
+            raise ValueError("Near-cache size should be greater than 0")
+
+        self.size = size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+        # NOTE: Bumped by every invalidation, a fetch which raced one isn't stored
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires, value = entry
+        if expires <= monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any, generation: int):
+        if generation != self.generation:
+            return None
+
+        self._entries[key] = (monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: str):
+        self.generation += 1
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self.generation += 1
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "capacity": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class KeyspaceInvalidator:
+    def __init__(self, driver: RedisDriver, reconnect_delay: float = 1.0) -> None:
+        self.driver = driver
+        self.reconnect_delay = reconnect_delay
+        self.logger = getLogger("ascender-plugins")
+
+        self.caches: dict[str, NearCache] = {}
+        self.hashed = False
+        self._pubsub = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def db(self) -> int:
+        return int(self.driver.connection.connection_pool.connection_kwargs.get("db", 0))
+
+    def pattern(self, entityname: str):
+        return f"__keyspace@{self.db}__:{entityname}:*"
+
+    def watch(self, entityname: str, cache: NearCache, hashed: bool = False):
+        pattern = self.pattern(entityname)
+        self.caches[pattern] = cache
+
+        # Hash-backed entity is written with hash commands, which need their own event class
+        if hashed and not self.hashed:
+            self.hashed = True
+            if self._task is not None:
+                asyncio.ensure_future(self.check_notifications())
+
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+        elif self._pubsub is not None:
+            asyncio.ensure_future(self._pubsub.psubscribe(pattern))
+
+    async def check_notifications(self):
+        # NOTE: Cross-process invalidation needs keyspace events for string writes, generic commands & expirations,
+        # e.g. `notify-keyspace-events KA` or at least `Kg$xe` (`Kg$hxe` once hash-backed entity is cached)
+        required = "g$hx" if self.hashed else "g$x"
+
+        try:
+            config = await self.driver.connection.config_get("notify-keyspace-events")
+        except Exception as e:
+            self.logger.warning(f"Near-cache can't read `notify-keyspace-events` ({e}), "
+                                "remote writes are seen only once entries expire by TTL")
+            return None
+
+        flags = config.get("notify-keyspace-events", "")
+        flags = flags.decode() if isinstance(flags, bytes) else flags
+
+        if "K" not in flags or not ("A" in flags or all(flag in flags for flag in required)):
+            self.logger.warning(f"Redis `notify-keyspace-events` is {flags!r}, near-cache won't see remote writes "
+                                f"before entries expire by TTL, enable at least `K{required}e`")
+
+    async def run(self):
+        await self.check_notifications()
+
+        while True:
+            self._pubsub = pubsub = self.driver.connection.pubsub()
+
+            try:
+                # Only this process' cached tables are subscribed, not the whole keyspace of a shared database
+                await pubsub.psubscribe(*self.caches)
+
+                # Whatever was written while subscription was down is unknown, so caches start over
+                for cache in self.caches.values():
+                    cache.clear()
+
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+
+                    pattern, channel = message["pattern"], message["channel"]
+                    pattern = pattern.decode() if isinstance(pattern, bytes) else pattern
+                    channel = channel.decode() if isinstance(channel, bytes) else channel
+
+                    if (cache := self.caches.get(pattern)) is not None:
+                        cache.invalidate(channel.split(":", 1)[1])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.warning(f"Near-cache invalidation subscription failed: {e}, resubscribing...")
+                await asyncio.sleep(self.reconnect_delay)
+            finally:
+                self._pubsub = None
+                await pubsub.aclose()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+# NOTE: Keyed by driver as well, forked process resolves its own driver and doesn't reuse parent's cache
+near_caches: dict[tuple[type, RedisDriver], NearCache] = {}
+invalidators: dict[RedisDriver, KeyspaceInvalidator] = {}
+
+
+def near_cache(entity: type, driver: RedisDriver, size: int, ttl: float) -> NearCache:
+    if (cache := near_caches.get((entity, driver))) is not None:
+        return cache
+
+    cache = near_caches[(entity, driver)] = NearCache(size, ttl)
+
+    if (invalidator := invalidators.get(driver)) is None:
+        invalidator = invalidators[driver] = KeyspaceInvalidator(driver)
+
+    invalidator.watch(entity._entityname.default, cache, entity._storage.default == "hash")
+    return cache
+
+
+async def stop_invalidators():
+    for invalidator in invalidators.values():
+        await invalidator.stop()
+
+    invalidators.clear()
+    near_caches.clear()
@@ -1,34 +1,46 @@
+import asyncio
 from datetime import timedelta
-from typing import Any
+from typing import Any, AsyncIterator, Literal
 
-from requests import delete
 from plugins.microservices.backends.redis import RedisDriver
 from plugins.microservices.exceptions.connections import UnsupportedConnectionError
+from plugins.microservices.redis.indexes import decode_id, fetch_values, id_index_key
 from plugins.microservices.types.connections import LiveConnections
 
 
+# NOTE: Id is pruned only if its entity is still missing, one saved again meanwhile keeps its index entry
+PRUNE_DANGLING_IDS = """
+local removed = 0
+for i = 1, #ARGV do
+    if redis.call("EXISTS", KEYS[i + 1]) == 0 then
+        removed = removed + redis.call("ZREM", KEYS[1], ARGV[i])
+    end
+end
+return removed
+"""
+
+
 class RedisEngine:
-    def __init__(self, connections: LiveConnections) -> None:
+    def __init__(self, connections: LiveConnections, chunk_size: int = 1000) -> None:
         self.connections = connections
-    
-    async def get(self, key: str, connection: str | None = None) -> Any | None:
+        self.chunk_size = chunk_size
+
+    def resolve(self, connection: str | None = None) -> RedisDriver:
         if not connection:
             if not (_connection := self.connections.get_default()):
                 raise KeyError("There is no active connections!")
         
         else:
             if not (_connection := self.connections[connection]):
-                return await self.get(key)
+                return self.resolve()
         
         if not isinstance(_connection, RedisDriver):
             raise UnsupportedConnectionError("Unsupported connection"\
                                              f"Expected RedisDriver, got {_connection.__class__.__name__}")
 
-        return await _connection.get(key)
+        return _connection
     
-    async def set(self, key: str, value: str, ttl: float | timedelta | None = None, 
-                  keepttl: bool = False,
-                  connection: str | None = None):
+    async def get(self, key: str, connection: str | None = None) -> Any | None:
         if not connection:
             if not (_connection := self.connections.get_default()):
                 raise KeyError("There is no active connections!")
@@ -41,35 +53,116 @@ class RedisEngine:
             raise UnsupportedConnectionError("Unsupported connection"\
                                              f"Expected RedisDriver, got {_connection.__class__.__name__}")
 
-        return await _connection.set(key, value, 
-                                     ex=ttl, keepttl=keepttl)
+        return await _connection.get(key)
     
-    async def get_all(self, tablename: str, connection: str | None = None) -> list[Any]:
+    async def set(self, key: str, value: str, ttl: float | timedelta | None = None, 
+                  keepttl: bool = False,
+                  connection: str | None = None):
         if not connection:
             if not (_connection := self.connections.get_default()):
                 raise KeyError("There is no active connections!")
         
         else:
             if not (_connection := self.connections[connection]):
-                return await self.get_all(tablename)
+                return await self.get(key)
         
         if not isinstance(_connection, RedisDriver):
             raise UnsupportedConnectionError("Unsupported connection"\
                                              f"Expected RedisDriver, got {_connection.__class__.__name__}")
-        matches = []
-        cursor = b'0'
-
-        while cursor:
-            cursor, partial_keys = await _connection.connection.scan(cursor, match=f"{tablename}:*")
-            matches.extend(partial_keys)
 
-        
+        return await _connection.set(key, value, 
+                                     ex=ttl, keepttl=keepttl)
+    
+    async def get_all(self, tablename: str, connection: str | None = None, *,
+                      chunk_size: int | None = None,
+                      storage: Literal["json", "hash"] = "json") -> list[Any]:
         values = []
-        for match in matches:
-            values.append(await _connection.get(match))
-        
+        async for chunk in self.iter_all(tablename, connection, chunk_size=chunk_size, storage=storage):
+            values.extend(chunk)
+
         return values
-    
+
+    async def iter_all(self, tablename: str, connection: str | None = None, *,
+                       chunk_size: int | None = None,
+                       storage: Literal["json", "hash"] = "json") -> AsyncIterator[list[Any]]:
+        _connection = self.resolve(connection).connection
+        chunk_size = chunk_size or self.chunk_size
+        key = id_index_key(tablename)
+
+        pending: tuple[list[bytes], asyncio.Future] | None = None
+        dangling: list[bytes] = []
+        offset = 0
+
+        try:
+            while True:
+                ids = await _connection.zrange(key, offset, offset + chunk_size - 1)
+                offset += len(ids)
+
+                # NOTE: MGET of this page is in flight while previous one is handed out and next page of ids is read
+                previous, pending = pending, (ids, asyncio.ensure_future(
+                    fetch_values(_connection, [f"{tablename}:{decode_id(id)}" for id in ids], storage))) if ids else None
+                if previous:
+                    yield await self._collect(*previous, dangling)
+
+                if len(ids) < chunk_size:
+                    break
+
+            if pending:
+                previous, pending = pending, None
+                yield await self._collect(*previous, dangling)
+        finally:
+            if pending and not pending[1].done():
+                pending[1].cancel()
+
+            # Ids of entities expired by TTL are pruned once iteration is over, so offsets don't shift under it
+            if dangling:
+                await _connection.eval(PRUNE_DANGLING_IDS, len(dangling) + 1, key,
+                                       *(f"{tablename}:{decode_id(id)}" for id in dangling), *dangling)
+
+    @staticmethod
+    async def _collect(ids: list[bytes], fetch: asyncio.Future, dangling: list[bytes]) -> list[Any]:
+        values = await fetch
+        dangling.extend(id for id, value in zip(ids, values) if value is None)
+        return [value for value in values if value is not None]
+
+    async def page(self, tablename: str, offset: int = 0, limit: int | None = None,
+                   connection: str | None = None,
+                   storage: Literal["json", "hash"] = "json") -> list[Any]:
+        _connection = self.resolve(connection).connection
+
+        ids = await _connection.zrange(id_index_key(tablename), offset, -1 if limit is None else offset + limit - 1)
+        if not ids:
+            return []
+
+        values = await fetch_values(_connection, [f"{tablename}:{decode_id(id)}" for id in ids], storage)
+        return [value for value in values if value is not None]
+
+    async def count(self, tablename: str, connection: str | None = None) -> int:
+        return await self.resolve(connection).connection.zcard(id_index_key(tablename))
+
+    async def set_entity(self, tablename: str, id: Any, value: str, ttl: float | timedelta | None = None,
+                         keepttl: bool = False,
+                         connection: str | None = None):
+        async with self.resolve(connection).connection.pipeline(transaction=True) as pipe:
+            pipe.set(f"{tablename}:{id}", value, ex=ttl, keepttl=keepttl)
+            pipe.zadd(id_index_key(tablename), {str(id): 0})
+            await pipe.execute()
+
+    async def rebuild_ids(self, tablename: str, connection: str | None = None) -> int:
+        # NOTE: One-off backfill for entities written before the id index existed, it's the only SCAN left
+        _connection = self.resolve(connection).connection
+        key, prefix = id_index_key(tablename), f"{tablename}:"
+
+        total, cursor = 0, 0
+        while True:
+            cursor, partial_keys = await _connection.scan(cursor, match=f"{tablename}:*", count=self.chunk_size)
+            if partial_keys:
+                await _connection.zadd(key, {decode_id(_key)[len(prefix):]: 0 for _key in partial_keys})
+                total += len(partial_keys)
+
+            if not cursor:
+                return total
+
     async def delete(self, tablename: str, key: str | list[str], connection: str | None = None):
         if not connection:
             if not (_connection := self.connections.get_default()):
@@ -82,10 +175,14 @@ class RedisEngine:
         if not isinstance(_connection, RedisDriver):
             raise UnsupportedConnectionError("Unsupported connection"\
                                              f"Expected RedisDriver, got {_connection.__class__.__name__}")
-        if isinstance(key, str):
-            await _connection.connection.delete(f"{tablename}:{key}")
+        if not isinstance(key, list):
+            key = [key]
+
+        if not key:
             return None
-        
-        keys = [f"{tablename}:{k}" for k in key]
-        await _connection.connection.delete(*keys)
+
+        async with _connection.connection.pipeline(transaction=True) as pipe:
+            pipe.delete(*[f"{tablename}:{k}" for k in key])
+            pipe.zrem(id_index_key(tablename), *[str(k) for k in key])
+            await pipe.execute()
         return None
\ No newline at end of file
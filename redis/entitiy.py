@@ -1,44 +1,290 @@
+import json
 from datetime import timedelta
-from typing import Any, Self, TypeVar
-from pydantic import BaseModel, ConfigDict, PrivateAttr
+from typing import Any, AsyncIterator, Callable, Iterable, Literal, Self, TypeVar
+from pydantic import BaseModel, ConfigDict, PrivateAttr, TypeAdapter
 
+from plugins.microservices.redis.cache import NearCache, near_cache
+from plugins.microservices.redis.indexes import EntityIndexer
 from plugins.microservices.redis.riter import RIterable
 from plugins.microservices.redis.singleton import RedisEngineSingleton
 
+_field_adapters: dict[tuple[type, str], TypeAdapter] = {}
+
 
 class RedisEntity(BaseModel):
 
     _entityname: str
     _primaryfield: str = "id"
     _connection: str | None = None
+    # NOTE: Equality indexes are sets per value, range indexes are sorted sets (numbers, dates & datetimes)
+    _indexes: tuple[str, ...] = ()
+    _range_indexes: tuple[str, ...] = ()
+    # NOTE: Opt-in per-process cache of validated entities for `get`, 0 disables it
+    _cache_size: int = 0
+    _cache_ttl: float = 30.0
+    # NOTE: "hash" keeps one hash field per model field, which enables `update`, `increment` & `get(fields=...)`
+    _storage: Literal["json", "hash"] = "json"
+
+    @classmethod
+    def _indexer(cls) -> EntityIndexer | None:
+        if not cls._indexes.default and not cls._range_indexes.default and cls._storage.default == "json":
+            return None
+
+        return EntityIndexer(cls._entityname.default, cls._indexes.default, cls._range_indexes.default,
+                             storage=cls._storage.default, primaryfield=cls._primaryfield.default)
+
+    @classmethod
+    def _parse(cls, raw: bytes | dict[bytes, bytes]) -> Self:
+        if isinstance(raw, dict):
+            return cls.model_validate({field.decode(): json.loads(value) for field, value in raw.items()})
+
+        return cls.model_validate_json(raw)
+
+    @classmethod
+    def _parse_field(cls, field: str, raw: bytes) -> Any:
+        if (adapter := _field_adapters.get((cls, field))) is None:
+            adapter = _field_adapters[(cls, field)] = TypeAdapter(cls.model_fields[field].rebuild_annotation())
+
+        return adapter.validate_json(raw)
+
+    def _hash_storage(self, method: str, fields: Iterable[str]) -> EntityIndexer:
+        if self._storage != "hash":
+            raise ValueError(f"{type(self).__name__}.{method} requires `_storage = \"hash\"`")
+
+        if unknown := [field for field in fields if field not in type(self).model_fields]:
+            raise ValueError(f"{type(self).__name__} has no fields {unknown}")
+
+        return self._indexer()
+
+    @classmethod
+    def _near_cache(cls) -> NearCache | None:
+        if not cls._cache_size.default:
+            return None
+
+        return near_cache(cls, RedisEngineSingleton().resolve(cls._connection.default),
+                          cls._cache_size.default, cls._cache_ttl.default)
+
+    @classmethod
+    def cache_stats(cls):
+        return cache.stats() if (cache := cls._near_cache()) else None
+
+    @classmethod
+    def _invalidate(cls, *ids: Any):
+        if cache := cls._near_cache():
+            for id in ids:
+                cache.invalidate(f"{cls._entityname.default}:{id}")
 
     @classmethod
-    async def get(cls, id: Any) -> Self | None:
+    async def get(cls, id: Any, fields: list[str] | None = None) -> Self | dict[str, Any] | None:
         redis_engine = RedisEngineSingleton()
-        if _result := await redis_engine.get(f"{cls._entityname.default}:{id}", cls._connection.default):
-            return cls.model_validate_json(_result)
+        key = f"{cls._entityname.default}:{id}"
+
+        if fields is not None:
+            return await cls._get_fields(key, fields)
+
+        if cache := cls._near_cache():
+            # Deep copy keeps callers' changes, in-place ones of nested lists & models too, out of the shared cached instance
+            if (cached := cache.get(key)) is not None:
+                return cached.model_copy(deep=True)
+            generation = cache.generation
+
+        if cls._storage.default == "hash":
+            _result = await redis_engine.resolve(cls._connection.default).connection.hgetall(key)
+        else:
+            _result = await redis_engine.get(key, cls._connection.default)
+
+        if _result:
+            entity = cls._parse(_result)
+            if cache:
+                cache.put(key, entity.model_copy(deep=True), generation)
+
+            return entity
         
         return None
+
+    @classmethod
+    async def _get_fields(cls, key: str, fields: list[str]) -> dict[str, Any] | None:
+        if cls._storage.default != "hash":
+            raise ValueError(f"{cls.__name__}.get(fields=...) projection requires `_storage = \"hash\"`")
+
+        # Projection reads only requested hash fields, each validated against its own annotation
+        values = await RedisEngineSingleton().resolve(cls._connection.default).connection.hmget(key, fields)
+        if all(value is None for value in values):
+            return None
+
+        return {field: cls._parse_field(field, value) for field, value in zip(fields, values) if value is not None}
     
     @classmethod
     async def all(cls) -> RIterable[Self]:
+        _response = RIterable()
+        async for chunk in cls.aiter_chunks():
+            _response.extend(chunk)
+
+        _response.set_redis_type(cls)
+        return _response
+
+    @classmethod
+    async def aiter_chunks(cls, batch_size: int | None = None) -> AsyncIterator[RIterable[Self]]:
+        redis_engine = RedisEngineSingleton()
+
+        # NOTE: Pages are taken by offset in the id index, deleting entities of a table while iterating it skips some
+        async for _result in redis_engine.iter_all(cls._entityname.default, cls._connection.default,
+                                                   chunk_size=batch_size, storage=cls._storage.default):
+            _response = RIterable([cls._parse(result) for result in _result])
+            _response.set_redis_type(cls)
+            yield _response
+
+    @classmethod
+    async def aiter(cls, batch_size: int | None = None) -> AsyncIterator[Self]:
+        async for chunk in cls.aiter_chunks(batch_size):
+            for entity in chunk:
+                yield entity
+
+    @classmethod
+    async def page(cls, offset: int = 0, limit: int | None = None) -> RIterable[Self]:
         redis_engine = RedisEngineSingleton()
+
+        _result = await redis_engine.page(cls._entityname.default, offset, limit, cls._connection.default,
+                                          cls._storage.default)
+        _response = RIterable([cls._parse(result) for result in _result])
+        _response.set_redis_type(cls)
+        return _response
+
+    @classmethod
+    async def rebuild_index(cls) -> int:
+        redis_engine = RedisEngineSingleton()
+
+        if indexer := cls._indexer():
+            return await indexer.rebuild(redis_engine.resolve(cls._connection.default).connection,
+                                         cls._parse, redis_engine.chunk_size)
+
+        return await redis_engine.rebuild_ids(cls._entityname.default, cls._connection.default)
+
+    @classmethod
+    async def filter(cls, **fields: Any) -> RIterable[Self]:
+        if not (indexer := cls._indexer()) or not fields:
+            raise ValueError(f"{cls.__name__}.filter requires indexed fields, declare them in `_indexes`")
         
-        _result = await redis_engine.get_all(cls._entityname.default, cls._connection.default)
-        _response = RIterable([cls.model_validate_json(result) for result in _result])
+        indexer.check(fields)
+        _connection = RedisEngineSingleton().resolve(cls._connection.default).connection
+
+        ids, index_keys = await indexer.equal_ids(_connection, fields)
+        _response = RIterable(await indexer.fetch(_connection, ids, cls._parse, index_keys=index_keys))
+        _response.set_redis_type(cls)
+        return _response
+
+    @classmethod
+    async def range(cls, field: str, lo: Any = None, hi: Any = None,
+                    limit: int | None = None, offset: int = 0) -> RIterable[Self]:
+        if not (indexer := cls._indexer()):
+            raise ValueError(f"{cls.__name__}.range requires range indexed field, declare it in `_range_indexes`")
+        
+        indexer.check([field], range=True)
+        _connection = RedisEngineSingleton().resolve(cls._connection.default).connection
+
+        ids = await indexer.range_ids(_connection, field, lo, hi, limit, offset)
+        _response = RIterable(await indexer.fetch(_connection, ids, cls._parse,
+                                                  range_keys=[indexer.range_key(field)]))
         _response.set_redis_type(cls)
         return _response
+
+    @classmethod
+    async def count(cls, **fields: Any) -> int:
+        redis_engine = RedisEngineSingleton()
+        if not fields:
+            return await redis_engine.count(cls._entityname.default, cls._connection.default)
+
+        if not (indexer := cls._indexer()):
+            raise ValueError(f"{cls.__name__}.count by fields requires them to be declared in `_indexes`")
+
+        # NOTE: Entities expired by TTL are counted until a `filter` on the same value prunes them
+        indexer.check(fields)
+        return await indexer.count_equal(redis_engine.resolve(cls._connection.default).connection, fields)
     
+    @classmethod
+    async def save_many(cls, entities: Iterable[Self],
+                        ttl: float | timedelta | Callable[[Self], float | timedelta | None] | None = None, *,
+                        chunk_size: int | None = None,
+                        transaction: bool = False) -> int:
+        redis_engine = RedisEngineSingleton()
+        _connection = redis_engine.resolve(cls._connection.default).connection
+        indexer = cls._indexer() or EntityIndexer(cls._entityname.default)
+        chunk_size = chunk_size or redis_engine.chunk_size
+
+        # NOTE: Each chunk is one round-trip (MULTI/EXEC when `transaction` or entity is indexed), atomicity doesn't span chunks
+        async def flush(chunk: dict[str, tuple[str, Self, Any, Any]]):
+            await indexer.save_many(_connection, list(chunk.values()), cls._parse, transaction)
+            cls._invalidate(*chunk)
+
+        total, chunk = 0, {}
+        for entity in entities:
+            id = str(getattr(entity, cls._primaryfield.default))
+            # Repeated id within a chunk keeps the last version only, like sequential saves would
+            chunk[id] = (id, entity, indexer.serialize(entity), ttl(entity) if callable(ttl) else ttl)
+
+            if len(chunk) >= chunk_size:
+                await flush(chunk)
+                total, chunk = total + len(chunk), {}
+
+        if chunk:
+            await flush(chunk)
+            total += len(chunk)
+
+        return total
+
     async def save(self, ttl: float | timedelta | None = None,
                    _keepttl: bool = False):
         redis_engine = RedisEngineSingleton()
 
-        await redis_engine.set(f"{self._entityname}:{getattr(self, self._primaryfield)}", self.model_dump_json(),
-                                         ttl, _keepttl,
-                                         self._connection)
+        if indexer := self._indexer():
+            await indexer.save(redis_engine.resolve(self._connection).connection,
+                               str(getattr(self, self._primaryfield)), self, indexer.serialize(self),
+                               ttl, _keepttl, self._parse)
+        else:
+            await redis_engine.set_entity(self._entityname, getattr(self, self._primaryfield), self.model_dump_json(),
+                                          ttl, _keepttl,
+                                          self._connection)
+
+        # NOTE: Invalidated after the write, so a `get` racing it can't put the previous version back
+        self._invalidate(getattr(self, self._primaryfield))
     
     async def delete(self):
         redis_engine = RedisEngineSingleton()
 
-        await redis_engine.delete(self._entityname, getattr(self, self._primaryfield),
-                                  self._connection)
\ No newline at end of file
+        if indexer := self._indexer():
+            await indexer.delete(redis_engine.resolve(self._connection).connection,
+                                 [str(getattr(self, self._primaryfield))], self._parse)
+        else:
+            await redis_engine.delete(self._entityname, getattr(self, self._primaryfield),
+                                      self._connection)
+
+        self._invalidate(getattr(self, self._primaryfield))
+
+    async def update(self, **fields: Any):
+        indexer = self._hash_storage("update", fields)
+
+        # Whole model is re-validated in memory, only changed fields go over the wire
+        updated = self.model_validate({**self.model_dump(), **fields})
+        await indexer.update_fields(RedisEngineSingleton().resolve(self._connection).connection,
+                                    str(getattr(self, self._primaryfield)), updated, fields, self._parse_field)
+
+        for field in fields:
+            setattr(self, field, getattr(updated, field))
+
+        self._invalidate(getattr(self, self._primaryfield))
+
+    async def increment(self, field: str, amount: int | float = 1) -> int | float:
+        indexer = self._hash_storage("increment", [field])
+
+        current = getattr(self, field)
+        if isinstance(current, bool) or not isinstance(current, (int, float)):
+            raise TypeError(f"{type(self).__name__}.{field} isn't numeric and can't be incremented")
+
+        # NOTE: Float fields are stored like "5.0", which only HINCRBYFLOAT accepts
+        amount = float(amount) if isinstance(current, float) else amount
+        result = await indexer.increment(RedisEngineSingleton().resolve(self._connection).connection,
+                                         str(getattr(self, self._primaryfield)), field, amount, self._parse_field)
+
+        setattr(self, field, type(current)(result))
+        self._invalidate(getattr(self, self._primaryfield))
+        return getattr(self, field)
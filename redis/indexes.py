@@ -0,0 +1,358 @@
+import json
+from datetime import date, datetime, time
+from enum import Enum
+from typing import Any, Callable, Iterable, Literal
+
+from pydantic import BaseModel
+from redis.asyncio import Redis
+from redis.exceptions import WatchError
+
+INDEX_PREFIX = "__idx__"
+RANGE_INDEX_PREFIX = "__ridx__"
+ID_INDEX_PREFIX = "__ids__"
+
+
+def id_index_key(entityname: str) -> str:
+    return f"{ID_INDEX_PREFIX}:{entityname}"
+
+
+def index_value(value: Any) -> str:
+    if isinstance(value, Enum):
+        value = value.value
+
+    if isinstance(value, bool):
+        return "true" if value else "false"
+
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+
+    return str(value)
+
+
+def index_score(value: Any) -> float:
+    # NOTE: Naive datetimes are scored in local time, keep range indexed datetimes timezone-aware
+    if isinstance(value, datetime):
+        return value.timestamp()
+
+    if isinstance(value, date):
+        return float(value.toordinal())
+
+    if isinstance(value, Enum):
+        value = value.value
+
+    return float(value)
+
+
+def decode_id(id: bytes | str) -> str:
+    return id.decode() if isinstance(id, bytes) else id
+
+
+def encode_fields(entity: BaseModel, fields: Iterable[str] | None = None) -> dict[str, str]:
+    # NOTE: Every hash field keeps JSON of its value, so numbers stay HINCRBY/HINCRBYFLOAT compatible
+    data = entity.model_dump(mode="json", include=set(fields) if fields is not None else None)
+    return {field: json.dumps(value) for field, value in data.items()}
+
+
+async def fetch_values(redis: Redis, keys: list[str], storage: Literal["json", "hash"] = "json") -> list[Any]:
+    if storage == "json":
+        return await redis.mget(keys)
+
+    async with redis.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.hgetall(key)
+
+        # Missing hash comes back empty, it's normalized to None like MGET does for missing strings
+        return [value or None for value in await pipe.execute()]
+
+
+class EntityIndexer:
+    def __init__(self, entityname: str, indexes: Iterable[str] = (), range_indexes: Iterable[str] = (), *,
+                 storage: Literal["json", "hash"] = "json",
+                 primaryfield: str = "id") -> None:
+        self.entityname = entityname
+        self.indexes = tuple(indexes)
+        self.range_indexes = tuple(range_indexes)
+        self.storage = storage
+        self.primaryfield = primaryfield
+
+    @property
+    def indexed(self):
+        return bool(self.indexes or self.range_indexes)
+
+    def serialize(self, entity: BaseModel) -> str | dict[str, str]:
+        return encode_fields(entity) if self.storage == "hash" else entity.model_dump_json()
+
+    def write(self, pipe: Redis, key: str, value: str | dict[str, str], ttl: Any, keepttl: bool):
+        if self.storage == "json":
+            pipe.set(key, value, ex=ttl, keepttl=keepttl)
+            return None
+
+        pipe.hset(key, mapping=value)
+        # Same expiration semantics as SET: new TTL, kept TTL or no TTL at all
+        if ttl is not None:
+            pipe.expire(key, ttl)
+        elif not keepttl:
+            pipe.persist(key)
+
+    async def read_watched(self, pipe: Redis, keys: list[str]) -> list[Any]:
+        # NOTE: WATCHing pipeline runs commands immediately, so hashes are read one by one here
+        if self.storage == "json":
+            return await pipe.mget(keys)
+
+        return [await pipe.hgetall(key) or None for key in keys]
+
+    def equality_key(self, field: str, value: Any):
+        return f"{INDEX_PREFIX}:{self.entityname}:{field}:{index_value(value)}"
+
+    def range_key(self, field: str):
+        return f"{RANGE_INDEX_PREFIX}:{self.entityname}:{field}"
+
+    def check(self, fields: Iterable[str], range: bool = False):
+        indexed = self.range_indexes if range else self.indexes
+        if missing := [field for field in fields if field not in indexed]:
+            raise ValueError(f"Fields {missing} of {self.entityname} aren't {'range ' if range else ''}indexed")
+
+    def add(self, pipe: Redis, id: str, entity: BaseModel):
+        for field in self.indexes:
+            pipe.sadd(self.equality_key(field, getattr(entity, field)), id)
+
+        for field in self.range_indexes:
+            if (value := getattr(entity, field)) is not None:
+                pipe.zadd(self.range_key(field), {id: index_score(value)})
+
+    def remove(self, pipe: Redis, id: str, entity: BaseModel):
+        for field in self.indexes:
+            pipe.srem(self.equality_key(field, getattr(entity, field)), id)
+
+        for field in self.range_indexes:
+            pipe.zrem(self.range_key(field), id)
+
+    async def save(self, redis: Redis, id: str, entity: BaseModel, value: str,
+                   ttl: Any, keepttl: bool, parse: Callable[[bytes], BaseModel]):
+        key = f"{self.entityname}:{id}"
+
+        if not self.indexed:
+            async with redis.pipeline(transaction=True) as pipe:
+                self.write(pipe, key, value, ttl, keepttl)
+                pipe.zadd(id_index_key(self.entityname), {id: 0})
+                await pipe.execute()
+                return None
+
+        # NOTE: Stored version is WATCHed, so concurrent writers can't leave index entries of overwritten values behind
+        async with redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(key)
+                    previous, = await self.read_watched(pipe, [key])
+
+                    pipe.multi()
+                    if previous is not None:
+                        self.remove(pipe, id, parse(previous))
+
+                    self.write(pipe, key, value, ttl, keepttl)
+                    pipe.zadd(id_index_key(self.entityname), {id: 0})
+                    self.add(pipe, id, entity)
+                    await pipe.execute()
+                    return None
+                except WatchError:
+                    continue
+
+    async def save_many(self, redis: Redis, items: list[tuple[str, BaseModel, str, Any]],
+                        parse: Callable[[bytes], BaseModel], transaction: bool = False):
+        keys = [f"{self.entityname}:{id}" for id, *_ in items]
+
+        # NOTE: Previous versions are needed to drop their index entries, an unWATCHed read racing concurrent save
+        # would leave stale equality entry behind, so indexed entities are always written in transaction
+        transaction = transaction or self.indexed
+
+        async with redis.pipeline(transaction=transaction) as pipe:
+            while True:
+                try:
+                    if self.indexed:
+                        await pipe.watch(*keys)
+                        previous = await self.read_watched(pipe, keys)
+                        pipe.multi()
+
+                        for (id, *_), value in zip(items, previous):
+                            if value is not None:
+                                self.remove(pipe, id, parse(value))
+
+                    if self.storage == "json" and all(ttl is None for *_, ttl in items):
+                        pipe.mset({key: value for key, (_, _, value, _) in zip(keys, items)})
+                    else:
+                        for key, (_, _, value, ttl) in zip(keys, items):
+                            self.write(pipe, key, value, ttl, False)
+
+                    pipe.zadd(id_index_key(self.entityname), {id: 0 for id, *_ in items})
+                    for id, entity, *_ in items:
+                        self.add(pipe, id, entity)
+
+                    await pipe.execute()
+                    return None
+                except WatchError:
+                    continue
+
+    async def update_fields(self, redis: Redis, id: str, entity: BaseModel, fields: Iterable[str],
+                            parse_field: Callable[[str, bytes], Any]):
+        key = f"{self.entityname}:{id}"
+        fields = list(fields)
+        indexed = [field for field in fields if field in self.indexes or field in self.range_indexes]
+        mapping = encode_fields(entity, fields)
+
+        async with redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    # NOTE: Primary field is read along, HSET on a deleted entity would leave a partial hash behind
+                    await pipe.watch(key)
+                    guard, *previous = await pipe.hmget(key, [self.primaryfield, *indexed])
+                    if guard is None:
+                        raise KeyError(f"{self.entityname} entity {id!r} doesn't exist")
+
+                    pipe.multi()
+                    pipe.hset(key, mapping=mapping)
+
+                    for field, value in zip(indexed, previous):
+                        if field in self.indexes:
+                            if value is not None:
+                                pipe.srem(self.equality_key(field, parse_field(field, value)), id)
+                            pipe.sadd(self.equality_key(field, getattr(entity, field)), id)
+
+                        if field in self.range_indexes:
+                            if (score := getattr(entity, field)) is None:
+                                pipe.zrem(self.range_key(field), id)
+                            else:
+                                pipe.zadd(self.range_key(field), {id: index_score(score)})
+
+                    await pipe.execute()
+                    return None
+                except WatchError:
+                    continue
+
+    async def increment(self, redis: Redis, id: str, field: str, amount: int | float,
+                        parse_field: Callable[[str, bytes], Any]) -> int | float:
+        key = f"{self.entityname}:{id}"
+
+        async with redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(key)
+                    guard, previous = await pipe.hmget(key, [self.primaryfield, field])
+                    if guard is None:
+                        raise KeyError(f"{self.entityname} entity {id!r} doesn't exist")
+
+                    pipe.multi()
+                    if isinstance(amount, float):
+                        pipe.hincrbyfloat(key, field, amount)
+                    else:
+                        pipe.hincrby(key, field, amount)
+
+                    if field in self.range_indexes:
+                        pipe.zincrby(self.range_key(field), amount, id)
+
+                    if field in self.indexes:
+                        value = parse_field(field, previous)
+                        pipe.srem(self.equality_key(field, value), id)
+                        pipe.sadd(self.equality_key(field, value + amount), id)
+
+                    result, *_ = await pipe.execute()
+                    return result
+                except WatchError:
+                    continue
+
+    async def delete(self, redis: Redis, ids: list[str], parse: Callable[[bytes], BaseModel]):
+        if not ids:
+            return None
+
+        keys = [f"{self.entityname}:{id}" for id in ids]
+
+        async with redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(*keys)
+                    previous = await self.read_watched(pipe, keys) if self.indexed else []
+
+                    pipe.multi()
+                    for id, value in zip(ids, previous):
+                        if value is not None:
+                            self.remove(pipe, id, parse(value))
+
+                    pipe.delete(*keys)
+                    pipe.zrem(id_index_key(self.entityname), *ids)
+                    await pipe.execute()
+                    return None
+                except WatchError:
+                    continue
+
+    async def rebuild(self, redis: Redis, parse: Callable[[bytes], BaseModel], chunk_size: int = 1000) -> int:
+        # NOTE: Not atomic, it's meant to be run once as a backfill while the table isn't written to
+        stale, cursor = [], 0
+        while True:
+            cursor, partial_keys = await redis.scan(cursor, match=f"{INDEX_PREFIX}:{self.entityname}:*", count=chunk_size)
+            stale.extend(partial_keys)
+            if not cursor:
+                break
+
+        if stale := [*stale, *[self.range_key(field) for field in self.range_indexes]]:
+            await redis.delete(*stale)
+
+        prefix, total, cursor = f"{self.entityname}:", 0, 0
+        while True:
+            cursor, partial_keys = await redis.scan(cursor, match=f"{self.entityname}:*", count=chunk_size)
+
+            if partial_keys:
+                values = await fetch_values(redis, partial_keys, self.storage)
+                async with redis.pipeline(transaction=False) as pipe:
+                    for key, value in zip(partial_keys, values):
+                        if value is None:
+                            continue
+
+                        id = decode_id(key)[len(prefix):]
+                        pipe.zadd(id_index_key(self.entityname), {id: 0})
+                        self.add(pipe, id, parse(value))
+                        total += 1
+
+                    await pipe.execute()
+
+            if not cursor:
+                return total
+
+    async def equal_ids(self, redis: Redis, fields: dict[str, Any]) -> tuple[list[str], list[str]]:
+        keys = [self.equality_key(field, value) for field, value in fields.items()]
+        ids = await redis.smembers(keys[0]) if len(keys) == 1 else await redis.sinter(keys)
+        return sorted(decode_id(id) for id in ids), keys
+
+    async def range_ids(self, redis: Redis, field: str, lo: Any = None, hi: Any = None,
+                        limit: int | None = None, offset: int = 0) -> list[str]:
+        paged = limit is not None or offset
+        ids = await redis.zrangebyscore(self.range_key(field),
+                                        "-inf" if lo is None else index_score(lo),
+                                        "+inf" if hi is None else index_score(hi),
+                                        start=offset if paged else None,
+                                        num=(-1 if limit is None else limit) if paged else None)
+        return [decode_id(id) for id in ids]
+
+    async def count_equal(self, redis: Redis, fields: dict[str, Any]) -> int:
+        if len(fields) == 1:
+            field, value = next(iter(fields.items()))
+            return await redis.scard(self.equality_key(field, value))
+
+        ids, _ = await self.equal_ids(redis, fields)
+        return len(ids)
+
+    async def fetch(self, redis: Redis, ids: list[str], parse: Callable[[bytes], BaseModel],
+                    index_keys: Iterable[str] = (), range_keys: Iterable[str] = ()) -> list[BaseModel]:
+        if not ids:
+            return []
+
+        values = await fetch_values(redis, [f"{self.entityname}:{id}" for id in ids], self.storage)
+
+        # Entities which expired by TTL leave dangling index entries, they're pruned from queried indexes
+        if dangling := [id for id, value in zip(ids, values) if value is None]:
+            async with redis.pipeline(transaction=False) as pipe:
+                for key in index_keys:
+                    pipe.srem(key, *dangling)
+                for key in range_keys:
+                    pipe.zrem(key, *dangling)
+                await pipe.execute()
+
+        return [parse(value) for value in values if value is not None]
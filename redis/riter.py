@@ -1,4 +1,4 @@
-from typing import Generic, TypeVar
+from typing import Any, Generic, TypeVar
 from plugins.microservices.redis.singleton import RedisEngineSingleton
 
 T = TypeVar("T")
@@ -12,10 +12,19 @@ class RIterable(Generic[T], list[T]):
 
     async def delete(self):
         redis_engine = RedisEngineSingleton()
+        ids = [getattr(result, self.entity_type._primaryfield.default) for result in self]
 
-        await redis_engine.delete(self.entity_type._entityname.default, [getattr(result, self.entity_type._primaryfield.default) 
-                                                                 for result in self], self.entity_type._connection.default)
+        if indexer := self.entity_type._indexer():
+            await indexer.delete(redis_engine.resolve(self.entity_type._connection.default).connection,
+                                 [str(id) for id in ids], self.entity_type._parse)
+        else:
+            await redis_engine.delete(self.entity_type._entityname.default, ids, self.entity_type._connection.default)
+
+        self.entity_type._invalidate(*ids)
     
+    async def save(self, ttl: Any = None, *, chunk_size: int | None = None, transaction: bool = False):
+        return await self.entity_type.save_many(self, ttl, chunk_size=chunk_size, transaction=transaction)
+
     async def first(self):
         try:
             return self[0]
@@ -0,0 +1,125 @@
+import json
+from typing import Any
+
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class Codec:
+    content_type: str
+    aliases: tuple[str, ...] = ()
+
+    # NOTE: JSON compatible codecs are validated by pydantic straight from body bytes
+    json_compatible: bool = False
+
+    def encode(self, body: Any) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+    def serialize(self, body: Any | BaseModel) -> bytes:
+        if isinstance(body, bytes):
+            return body
+
+        if isinstance(body, str):
+            return body.encode("utf-8")
+
+        return self.encode(body)
+
+
+class JSONCodec(Codec):
+    content_type = "application/json"
+    aliases = ("text/json",)
+    json_compatible = True
+
+    def encode(self, body: Any) -> bytes:
+        if isinstance(body, BaseModel):
+            return body.model_dump_json().encode("utf-8")
+
+        return json.dumps(
+            body,
+            ensure_ascii=False,
+            allow_nan=False,
+            indent=None,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class ORJSONCodec(JSONCodec):
+    def encode(self, body: Any) -> bytes:
+        if isinstance(body, BaseModel):
+            return body.model_dump_json().encode("utf-8")
+
+        return orjson.dumps(body)
+
+    def decode(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class MsgPackCodec(Codec):
+    content_type = "application/msgpack"
+    aliases = ("application/x-msgpack",)
+
+    def encode(self, body: Any) -> bytes:
+        if isinstance(body, BaseModel):
+            body = body.model_dump(mode="json")
+
+        return msgpack.packb(body, use_bin_type=True)
+
+    def decode(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False)
+
+
+class RawCodec(Codec):
+    content_type = "application/octet-stream"
+
+    def encode(self, body: Any) -> bytes:
+        raise TypeError(f"Raw codec expects `bytes` or `str` body, got {body.__class__.__name__}")
+
+    def decode(self, data: bytes) -> Any:
+        return data
+
+
+class CodecRegistry:
+    def __init__(self, default_content_type: str = "application/json") -> None:
+        self.default_content_type = default_content_type
+        self._codecs: dict[str, Codec] = {}
+
+    def register(self, codec: Codec):
+        for content_type in (codec.content_type, *codec.aliases):
+            self._codecs[content_type] = codec
+
+    def get(self, content_type: str | None = None) -> Codec:
+        if not content_type:
+            return self._codecs[self.default_content_type]
+
+        # NOTE: Strip parameters, e.g. "application/json; charset=utf-8"
+        content_type = content_type.split(";", 1)[0].strip().lower()
+        if (codec := self._codecs.get(content_type)) is None:
+            return self._codecs[self.default_content_type]
+
+        return codec
+
+    def __contains__(self, content_type: str):
+        return content_type.split(";", 1)[0].strip().lower() in self._codecs
+
+
+codec_registry = CodecRegistry()
+codec_registry.register(ORJSONCodec() if orjson else JSONCodec())
+codec_registry.register(RawCodec())
+
+if msgpack:
+    codec_registry.register(MsgPackCodec())
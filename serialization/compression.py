@@ -0,0 +1,129 @@
+import gzip
+import zlib
+from typing import Literal
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+
+class Compressor:
+    encoding: str
+
+    def compress(self, data: bytes, level: int | None = None) -> bytes:
+        raise NotImplementedError
+
+    def decompress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+
+class GzipCompressor(Compressor):
+    encoding = "gzip"
+
+    def compress(self, data: bytes, level: int | None = None) -> bytes:
+        return gzip.compress(data, compresslevel=6 if level is None else level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return gzip.decompress(data)
+
+
+class ZlibCompressor(Compressor):
+    # NOTE: HTTP "deflate" is zlib wrapped deflate stream
+    encoding = "deflate"
+
+    def compress(self, data: bytes, level: int | None = None) -> bytes:
+        return zlib.compress(data, -1 if level is None else level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompress(data)
+
+
+class ZstdCompressor(Compressor):
+    encoding = "zstd"
+
+    def compress(self, data: bytes, level: int | None = None) -> bytes:
+        return zstandard.ZstdCompressor(level=3 if level is None else level).compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+
+class LZ4Compressor(Compressor):
+    encoding = "lz4"
+
+    def compress(self, data: bytes, level: int | None = None) -> bytes:
+        return lz4_frame.compress(data, compression_level=0 if level is None else level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return lz4_frame.decompress(data)
+
+
+compressors: dict[str, Compressor] = {
+    "gzip": GzipCompressor(),
+    "deflate": ZlibCompressor(),
+}
+compressors["zlib"] = compressors["deflate"]
+
+if zstandard:
+    compressors["zstd"] = ZstdCompressor()
+
+if lz4_frame:
+    compressors["lz4"] = LZ4Compressor()
+
+
+class CompressionPolicy:
+    def __init__(self, algorithm: Literal["gzip", "zlib", "deflate", "zstd", "lz4"] = "gzip", *,
+                 threshold: int = 1024,
+                 level: int | None = None) -> None:
+        if algorithm not in compressors:
+            raise ValueError(f"Compression {algorithm!r} isn't available, installed: {sorted(compressors)}")
+
+        self.compressor = compressors[algorithm]
+        self.threshold = threshold
+        self.level = level
+
+    @property
+    def encoding(self):
+        return self.compressor.encoding
+
+    def compress(self, data: bytes) -> tuple[bytes, str | None]:
+        # Small payloads cost more CPU to compress than they save on the wire
+        if len(data) < self.threshold:
+            return data, None
+
+        return self.compressor.compress(data, self.level), self.compressor.encoding
+
+
+_default_policy: CompressionPolicy | None = None
+
+
+def set_default_compression(policy: CompressionPolicy | None):
+    global _default_policy
+    _default_policy = policy
+
+
+def resolve_compression(policy: CompressionPolicy | Literal[False] | None) -> CompressionPolicy | None:
+    # NOTE: `None` falls back to plugin-wide default, `False` explicitly disables compression
+    if policy is False:
+        return None
+
+    return policy or _default_policy
+
+
+def decompress(data: bytes, encoding: str | None) -> bytes:
+    if not encoding or encoding == "identity":
+        return data
+
+    if (compressor := compressors.get(encoding.lower())) is None:
+        raise ValueError(f"Unsupported content encoding {encoding!r}")
+
+    try:
+        return compressor.decompress(data)
+    except Exception as e:
+        raise ValueError(f"Failed to decompress {encoding!r} encoded body") from e
@@ -0,0 +1,122 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from plugins.microservices._core.outbox import OutboxRecord, PublishOutbox, SpillFile
+
+
+def routing_keys(path: str):
+    spill = SpillFile(path)
+    try:
+        records, _ = spill.read(spill.records)
+        return [record.routing_key for record in records]
+    finally:
+        spill.close()
+
+
+def test_spill_file_survives_reopen(tmp_path):
+    path = str(tmp_path / "outbox.spill")
+    timestamp = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+    spill = SpillFile(path, initial_size=64)
+    spill.append([OutboxRecord("events", f"key-{index}", b"x" * 100,
+                               {"timestamp": timestamp, "headers": {"raw": b"\x00\x01"}}) for index in range(3)])
+    records, offset = spill.read(1)
+    spill.commit(offset, 1)
+    spill.close()
+
+    spill = SpillFile(path)
+    records, offset = spill.read(10)
+
+    assert spill.records == 2
+    assert [record.routing_key for record in records] == ["key-1", "key-2"]
+    assert records[0].body == b"x" * 100
+    assert records[0].properties == {"timestamp": timestamp, "headers": {"raw": b"\x00\x01"}}
+
+    spill.commit(offset, len(records))
+    assert spill.records == 0 and spill.size == 0
+    spill.close()
+
+
+def test_spill_file_is_exclusive(tmp_path):
+    path = str(tmp_path / "outbox.spill")
+    spill = SpillFile(path)
+
+    try:
+        SpillFile(path)
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("Second process shouldn't open the same spill file")
+    finally:
+        spill.close()
+
+
+def test_close_persists_memory_records_in_front_of_spilled_ones(tmp_path):
+    path = str(tmp_path / "outbox.spill")
+
+    spill = SpillFile(path)
+    spill.append([OutboxRecord("events", "spilled", b"", {})])
+    spill.close()
+
+    async def scenario():
+        outbox = PublishOutbox(None, spill_path=path, flush_interval=60)
+        outbox.spill = SpillFile(path)
+        outbox._buffer.append(OutboxRecord("events", "memory", b"", {}))
+        await outbox.close()
+
+    asyncio.run(scenario())
+
+    assert routing_keys(path) == ["memory", "spilled"]
+
+
+def test_close_mid_flush_keeps_unconfirmed_batch(tmp_path):
+    path = str(tmp_path / "outbox.spill")
+
+    async def scenario():
+        outbox = PublishOutbox(None, batch_size=4, flush_interval=0.01, drain_timeout=0.05, spill_path=path)
+        blocked = asyncio.Event()
+
+        async def publish(record: OutboxRecord):
+            if record.routing_key == "key-0":
+                return SimpleNamespace(name="Basic.Ack")
+
+            await blocked.wait()
+
+        outbox._publish = publish
+        outbox.start()
+
+        for index in range(10):
+            outbox.enqueue("events", f"key-{index}", b"", {})
+
+        await asyncio.sleep(0.1)
+        await outbox.close()
+
+    asyncio.run(scenario())
+
+    # Confirmed record isn't published again, the rest of the cancelled batch keeps its order
+    assert routing_keys(path) == [f"key-{index}" for index in range(1, 10)]
+
+
+def test_close_lets_batch_in_progress_settle(tmp_path):
+    path = str(tmp_path / "outbox.spill")
+
+    async def scenario():
+        outbox = PublishOutbox(None, batch_size=3, flush_interval=0.01, drain_timeout=1.0, spill_path=path)
+
+        async def publish(record: OutboxRecord):
+            await asyncio.sleep(0.05)
+            return SimpleNamespace(name="Basic.Ack")
+
+        outbox._publish = publish
+        outbox.start()
+
+        for index in range(3):
+            outbox.enqueue("events", f"key-{index}", b"", {})
+
+        await asyncio.sleep(0.02)
+        await outbox.close()
+        return outbox.flushed
+
+    assert asyncio.run(scenario()) == 3
+    assert routing_keys(path) == []
@@ -0,0 +1,33 @@
+import asyncio
+
+from plugins.microservices._core.scheduler import WeightedFairScheduler
+
+
+def test_idle_class_does_not_starve_busy_class_after_fast_path():
+    async def scenario():
+        scheduler = WeightedFairScheduler(1, {"interactive": 10, "bulk": 1})
+
+        for _ in range(1000):
+            await scheduler.acquire("interactive")
+            scheduler.release()
+
+        # Uncontended acquire of a long idle class must not rewind the clock to its stale virtual time
+        await scheduler.acquire("bulk")
+
+        order: list[str] = []
+
+        async def run(priority_class: str):
+            async with scheduler.slot(priority_class):
+                order.append(priority_class)
+
+        tasks = [asyncio.create_task(run(name)) for name in ["bulk", "interactive"] * 50]
+        await asyncio.sleep(0)
+        scheduler.release()
+        await asyncio.gather(*tasks)
+
+        return order
+
+    order = asyncio.run(scenario())
+
+    assert order[:50].count("interactive") >= 40
+    assert order[:11].count("bulk") <= 2
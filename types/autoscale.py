@@ -0,0 +1,52 @@
+from typing import Literal, TypedDict
+
+
+class ScalingDecision(TypedDict):
+    channel: str
+    queue: str
+    depth: int
+    latency: float | None
+    previous_limit: int
+    limit: int
+    prefetch: int
+    reason: Literal["latency", "backlog", "idle", "steady"]
+
+
+class AutoscalePolicy:
+    def __init__(self, min_concurrency: int = 1, max_concurrency: int = 64, *,
+                 target_latency: float = 1.0,
+                 interval: float = 5.0,
+                 increase_step: int = 1,
+                 decrease_factor: float = 0.5,
+                 prefetch_multiplier: int = 2) -> None:
+        if not 1 <= min_concurrency <= max_concurrency:
+            raise ValueError("Autoscale bounds should satisfy 1 <= min_concurrency <= max_concurrency")
+
+        if not 0 < decrease_factor < 1:
+            raise ValueError("Autoscale decrease factor should be in (0, 1)")
+
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.interval = interval
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.prefetch_multiplier = prefetch_multiplier
+
+    def next_limit(self, limit: int, depth: int, latency: float | None,
+                   saturated: bool) -> tuple[int, Literal["latency", "backlog", "idle", "steady"]]:
+        # AIMD: back off multiplicatively when handlers get slow, grow additively while backlog waits on full limiter
+        if latency is not None and latency > self.target_latency:
+            return max(self.min_concurrency, int(limit * self.decrease_factor)), "latency"
+
+        if depth > 0 and saturated:
+            return min(self.max_concurrency, limit + self.increase_step), "backlog"
+
+        if depth == 0 and not saturated:
+            return max(self.min_concurrency, limit - self.increase_step), "idle"
+
+        return limit, "steady"
+
+    def prefetch(self, limit: int, batch_size: int | None = None):
+        # NOTE: Prefetch below batch size would never fill a batch, every one would wait for its timeout
+        return max(limit * self.prefetch_multiplier, batch_size or 0)
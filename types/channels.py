@@ -1,12 +1,21 @@
-from typing import Optional
+import asyncio
+from typing import Iterable, Literal, Optional
 
 from aio_pika import Exchange, IncomingMessage
 from core.registries.service import ServiceRegistry
 from core.types import ControllerModule
+from plugins.microservices._core.batch import BatchCollector
+from plugins.microservices._core.consumers import ConsumerRegistration
+from plugins.microservices._core.worker_pool import build_worker_pool, default_workers, ensure_shippable, resolve_work
+from plugins.microservices._core.outbox import PublishOutbox
 from plugins.microservices.context import MessageContext
 from plugins.microservices.handler import Channel
 from plugins.microservices.parsers.consume_handle import ConsumeHandleParser
+from plugins.microservices.serialization.codecs import codec_registry
+from plugins.microservices.serialization.compression import CompressionPolicy, decompress, resolve_compression
+from plugins.microservices.types.autoscale import AutoscalePolicy
 from plugins.microservices.types.modules import RQControllerExchanger, RQControllerQueue
+from plugins.microservices.types.retry import RetryPolicy
 
 
 class ControllerChannel:
@@ -16,6 +25,18 @@ class ControllerChannel:
                  enable_controller_exchanger: bool = False,
                  controller_exchanger: Optional[RQControllerExchanger] = None,
                  auto_acknowledgement: bool = True,
+                 prefetch_count: Optional[int] = None,
+                 prefetch_size: Optional[int] = None,
+                 max_concurrency: Optional[int] = None,
+                 batch_size: Optional[int] = None,
+                 batch_timeout_ms: int = 100,
+                 executor: Optional[Literal["process", "thread"]] = None,
+                 workers: Optional[int] = None,
+                 consumer_processes: Optional[int] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 priority_class: Optional[str] = None,
+                 autoscale: Optional[AutoscalePolicy] = None,
+                 compression: CompressionPolicy | Literal[False] | None = None,
                  connection: Optional[str] = None) -> None:
         self.channel = channel
         self.routing_key = routing_key
@@ -23,30 +44,164 @@ class ControllerChannel:
         self.enable_controller_exchanger = enable_controller_exchanger
         self.controller_exchanger = controller_exchanger
         self.auto_acknowledgement = auto_acknowledgement
+
+        self.batch_size = batch_size
+        self.batch_timeout_ms = batch_timeout_ms
+
+        if executor and batch_size:
+            raise ValueError("Batch consumption can't be combined with pooled `executor`")
+
+        # NOTE: Retry & parking queues are named after the consumed one, server-named queue changes on every reconnect
+        if retry_policy and not (queue and queue.name):
+            raise ValueError("`retry_policy` requires explicitly named `queue`, server-named queues can't own retry topology")
+
+        self.executor = executor
+        self.workers = (workers or default_workers()) if executor else None
+
+        # NOTE: Only effective in supervisor mode, falls back to `supervisor.processes` of plugin config
+        self.consumer_processes = consumer_processes
+        self.retry_policy = retry_policy
+        self.priority_class = priority_class
+        self.compression = compression
+        self.queue_name: str | None = None
+
+        # NOTE: If only concurrency is bounded, broker-side prefetch follows it so backpressure reaches RabbitMQ
+        self.autoscale = autoscale
+        self.max_concurrency = max_concurrency or self.workers or (autoscale.min_concurrency if autoscale else None)
+        self.prefetch_count = prefetch_count if prefetch_count is not None else max(filter(None, (self.max_concurrency, batch_size)), default=None)
+
+        if autoscale and prefetch_count is None:
+            self.prefetch_count = autoscale.prefetch(self.max_concurrency, batch_size)
+        self.prefetch_size = prefetch_size
         
         self.connection = connection
     
-    def define_channel(self, exchanger: Exchange):
+    def define_channel(self, exchanger: Exchange, outbox: PublishOutbox | None = None):
         service_registry = ServiceRegistry()
         
         _parameters = service_registry.get_parameters(self.channel)
         self._channel = self.channel(**_parameters)
         self._channel.exchange = exchanger
         self._channel.routing_key = self.routing_key
+        self._channel.compression = resolve_compression(self.compression)
+        self._channel.outbox = outbox
         self._exchanger = exchanger
+        self._parser = ConsumeHandleParser(self._channel.handle)
+        self._batch = None
+        self._pool = None
+
+        if self.executor:
+            self._work = resolve_work(self._channel, self.executor)
+            self._parser = ConsumeHandleParser(self._work)
+
+            if self.executor == "process":
+                ensure_shippable(self.channel, self._parser.body_type, "body type")
+
+            self._pool = build_worker_pool(self.executor, self.workers)
+
+        if self.batch_size:
+            if type(self._channel).handle_batch is Channel.handle_batch:
+                raise TypeError(f"Batch consumption requires {self.channel.__name__} to implement `handle_batch`")
+
+            self._batch_parser = ConsumeHandleParser(self._channel.handle_batch, batch=True)
+            self._batch = BatchCollector(self.batch_size, self.batch_timeout_ms / 1000, self.batch_callback)
+
         service_registry.add_singletone(self.channel, self._channel)
 
+    def rebind(self, consumer: ConsumerRegistration):
+        # NOTE: Called after reconnect, handler instance survives and only gets exchange of the new channel
+        self._exchanger = self._channel.exchange = consumer.exchange
+        self.queue_name = consumer.queue_name
+
     async def callback(self, message: IncomingMessage):
-        parser = ConsumeHandleParser(self._channel.handle)
-        message_context = MessageContext(message, self._exchanger, self._channel)
+        if self._batch:
+            return await self._batch.add(message)
+
+        message_context = MessageContext(message, self._exchanger, self._channel,
+                                         retry_policy=self.retry_policy, queue_name=self.queue_name)
 
         payload = [message_context]
 
-        if body := parser(message_context.message.body.decode()):
-            payload.append(body)
+        if self._parser.accepts_body:
+            try:
+                payload.append(self._parser(decompress(message.body, message.content_encoding),
+                                            codec_registry.get(message.content_type)))
+            except ValueError:
+                # NOTE: Same as in `batch_callback`, unsettled message would hold its prefetch slot forever
+                if not self.auto_acknowledgement:
+                    raise
+
+                await message.nack(requeue=False)
+                return None
+
+        handle = self.pooled_handle if self._pool else self._channel.handle
 
         if self.auto_acknowledgement:
-            async with message.process():
-                return await self._channel.handle(*payload)
+            # Message nacked by draining executor is already settled when its cancellation arrives here
+            async with message.process(ignore_processed=True):
+                return await handle(*payload)
+        
+        return await handle(*payload)
+
+    async def pooled_handle(self, ctx: MessageContext, *body):
+        result = await asyncio.get_running_loop().run_in_executor(self._pool, self._work, *body)
+        return await self._channel.handle_result(ctx, result)
+
+    async def flush(self):
+        if self._batch:
+            await self._batch.flush()
+
+    def close(self):
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    async def batch_callback(self, messages: list[IncomingMessage]):
+        contexts: list[MessageContext] = []
+        bodies = []
+
+        for message in messages:
+            try:
+                bodies.append(self._batch_parser(decompress(message.body, message.content_encoding),
+                                                 codec_registry.get(message.content_type)))
+            except ValueError:
+                # NOTE: Covers pydantic `ValidationError`, codec decoding and decompression errors
+                if self.auto_acknowledgement:
+                    await message.nack(requeue=False)
+                continue
+
+            contexts.append(MessageContext(message, self._exchanger, self._channel,
+                                           retry_policy=self.retry_policy, queue_name=self.queue_name))
+        
+        if not contexts:
+            return None
+
+        if not self.auto_acknowledgement:
+            return await self._channel.handle_batch(contexts, bodies)
+        
+        try:
+            failed = await self._channel.handle_batch(contexts, bodies)
+        except Exception:
+            await self.settle_batch(contexts, contexts)
+            raise
+        
+        await self.settle_batch(contexts, failed or [])
+
+    async def settle_batch(self, contexts: list[MessageContext], failed: Iterable[MessageContext]):
+        failed_ids = {id(ctx) for ctx in failed}
+
+        if len(failed_ids) == len(contexts):
+            return await contexts[-1].message.nack(multiple=True, requeue=False)
+
+        # Longest successful prefix is settled with single `multiple=True` frame
+        prefix = 0
+        while prefix < len(contexts) and id(contexts[prefix]) not in failed_ids:
+            prefix += 1
+        
+        if prefix:
+            await contexts[prefix - 1].message.ack(multiple=True)
         
-        return await self._channel.handle(*payload)
\ No newline at end of file
+        for ctx in contexts[prefix:]:
+            if id(ctx) in failed_ids:
+                await ctx.message.nack(requeue=False)
+            else:
+                await ctx.message.ack()
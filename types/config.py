@@ -2,6 +2,14 @@ from datetime import timedelta
 from typing import Literal, NotRequired, Optional, TypedDict
 
 
+class OutboxConfig(TypedDict):
+    capacity: NotRequired[int]
+    batch_size: NotRequired[int]
+    flush_interval: NotRequired[float]
+    retry_delay: NotRequired[float]
+    spill_path: NotRequired[str]
+
+
 class RabbitMQConnection(TypedDict):
     driver: Literal["microservices.backends.rabbitmq"]
     url: Optional[str]
@@ -9,6 +17,12 @@ class RabbitMQConnection(TypedDict):
     port: int
     login: str
     password: str
+    channels_per_connection: NotRequired[int]
+    publisher_channels: NotRequired[int]
+    publisher_connections: NotRequired[int]
+    outbox: NotRequired[OutboxConfig]
+    reconnect_delay: NotRequired[float]
+    reconnect_max_delay: NotRequired[float]
 
     default_queue: Optional[str]
 
@@ -20,6 +34,10 @@ class RedisConnection(TypedDict):
     port: NotRequired[int]
     password: NotRequired[str]
     db: NotRequired[str | int]
+    retries: NotRequired[int]
+    reconnect_delay: NotRequired[float]
+    reconnect_max_delay: NotRequired[float]
+    health_check_interval: NotRequired[float]
 
 
 class InternalPrivacyConfig(TypedDict):
@@ -30,7 +48,28 @@ class InternalPrivacyConfig(TypedDict):
     current_service_id: str
 
 
+class SupervisorConfig(TypedDict):
+    processes: int
+    restart_delay: NotRequired[float]
+    shutdown_timeout: NotRequired[float]
+
+
+class PrioritySchedulingConfig(TypedDict):
+    budget: int
+    classes: dict[str, int]
+
+
+class CompressionConfig(TypedDict):
+    algorithm: Literal["gzip", "zlib", "deflate", "zstd", "lz4"]
+    threshold: NotRequired[int]
+    level: NotRequired[int]
+
+
 class MainConfig(TypedDict):
     connections: dict[str, RabbitMQConnection | RedisConnection]
     default_connection: str
-    internal_privacy: NotRequired[InternalPrivacyConfig]
\ No newline at end of file
+    internal_privacy: NotRequired[InternalPrivacyConfig]
+    supervisor: NotRequired[SupervisorConfig]
+    drain_timeout: NotRequired[float]
+    priority_scheduling: NotRequired[PrioritySchedulingConfig]
+    compression: NotRequired[CompressionConfig]
\ No newline at end of file
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Literal
 from aiohttp.typedefs import LooseCookies, LooseHeaders
 from aiohttp import BasicAuth, ClientSession, TCPConnector
 
 from core.plugins.plugin_injector import PluginInjector
+from plugins.microservices.serialization.compression import CompressionPolicy, resolve_compression
 from plugins.microservices.waypoints.context import WaypointContext
 from plugins.microservices.waypoints.instance import WaypointInstance
 
@@ -19,7 +20,8 @@ class HTTPWaypoint:
                  cookies: LooseCookies | None = None,
                  headers: LooseHeaders | None = None,
                  ssl: bool = True, auth: BasicAuth | None = None,
-                 raise_for_status: bool = False, **additional_configs) -> None:
+                 raise_for_status: bool = False,
+                 compression: CompressionPolicy | Literal[False] | None = None, **additional_configs) -> None:
         self.base_url = base_url
         self.cookies = cookies
         self.headers = headers
@@ -27,6 +29,7 @@ class HTTPWaypoint:
         self.ssl = ssl
         self.auth = auth
         self.raise_for_status = raise_for_status
+        self.compression = compression
         self.additional_configs = additional_configs
 
         self.waypoint = waypoint
@@ -35,7 +38,8 @@ class HTTPWaypoint:
     def define_waypoint(self, injector: PluginInjector):
         
         _context = WaypointContext(TCPConnector(verify_ssl=self.ssl) if self.keep_connection else None, 
-                                   self.waypoint_register, base_url=self.base_url, ssl=self.ssl,
+                                   self.waypoint_register, resolve_compression(self.compression),
+                                   base_url=self.base_url, ssl=self.ssl,
                                 cookies=self.cookies, headers=self.headers,
                                 auth=self.auth, raise_for_status=self.raise_for_status,
                                 **self.additional_configs)
@@ -39,7 +39,8 @@ class RQControllerQueue:
                  passive: bool = False, 
                  auto_delete: bool = False, 
                  arguments: dict[str, Any] | None = None, 
-                 timeout: float | int | None = None) -> None:
+                 timeout: float | int | None = None,
+                 max_priority: int | None = None) -> None:
         self.name = name
         self.durable = durable
         self.exclusive = exclusive
@@ -47,13 +48,19 @@ class RQControllerQueue:
         self.auto_delete = auto_delete
         self.arguments = arguments
         self.timeout = timeout
+
+        if max_priority is not None:
+            self.arguments = {**(arguments or {}), "x-max-priority": max_priority}
     
+    async def declare(self, channel: AbstractChannel):
+        return await channel.declare_queue(self.name, durable=self.durable,
+                                           exclusive=self.exclusive,
+                                           passive=self.passive, auto_delete=self.auto_delete,
+                                           arguments=self.arguments, timeout=self.timeout)
+
     async def build(self, channel: AbstractChannel, exchanger: AbstractExchange,
                     routing_key: str | None = None):
-        queue = await channel.declare_queue(self.name, durable=self.durable,
-                                            exclusive=self.exclusive,
-                                            passive=self.passive, auto_delete=self.auto_delete,
-                                            arguments=self.arguments, timeout=self.timeout)
+        queue = await self.declare(channel)
         
         await queue.bind(exchanger, routing_key=routing_key)
         return queue
\ No newline at end of file
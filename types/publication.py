@@ -0,0 +1,40 @@
+from typing import Literal
+
+
+class PublicationResult:
+    def __init__(self) -> None:
+        self.acked: list[int] = []
+        self.nacked: list[int] = []
+        self.rejected: list[int] = []
+        self.errors: dict[int, BaseException] = {}
+        self.first_failure: tuple[int, Literal["Basic.Nack", "Basic.Reject"] | BaseException] | None = None
+
+    @property
+    def confirmed(self):
+        return self.acked
+
+    @property
+    def total(self):
+        return len(self.acked) + len(self.nacked) + len(self.rejected) + len(self.errors)
+
+    @property
+    def ok(self):
+        return self.first_failure is None
+
+    def record(self, index: int, state: Literal["Basic.Ack", "Basic.Nack", "Basic.Reject"] | BaseException):
+        if isinstance(state, BaseException):
+            self.errors[index] = state
+        elif state == "Basic.Ack":
+            self.acked.append(index)
+            return None
+        elif state == "Basic.Nack":
+            self.nacked.append(index)
+        else:
+            self.rejected.append(index)
+
+        if self.first_failure is None:
+            self.first_failure = (index, state)
+
+    def __repr__(self) -> str:
+        return (f"PublicationResult(acked={len(self.acked)}, nacked={len(self.nacked)}, "
+                f"rejected={len(self.rejected)}, errors={len(self.errors)})")
@@ -0,0 +1,53 @@
+import random
+from typing import TYPE_CHECKING
+
+from aio_pika.abc import AbstractChannel
+
+from plugins.microservices.types.modules import RQControllerQueue
+
+if TYPE_CHECKING:
+    from plugins.microservices._core.topology import TopologyCache
+
+
+class RetryPolicy:
+    attempt_header: str = "x-retry-attempt"
+
+    def __init__(self, max_attempts: int = 5, *,
+                 base_delay: float = 1.0,
+                 multiplier: float = 2.0,
+                 jitter: float = 0.1,
+                 durable: bool = True) -> None:
+        if max_attempts < 1:
+            raise ValueError("Retry policy should allow at least 1 attempt")
+
+        if not 0 <= jitter < 1:
+            raise ValueError("Retry jitter should be a fraction in [0, 1)")
+
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.durable = durable
+
+    def delay(self, attempt: int) -> float:
+        _delay = self.base_delay * self.multiplier ** (attempt - 1)
+        return _delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def retry_queue_name(self, queue_name: str, attempt: int):
+        return f"ascender.retry.{queue_name}.{attempt}"
+
+    def parking_queue_name(self, queue_name: str):
+        return f"ascender.parking.{queue_name}"
+
+    async def declare(self, topology: "TopologyCache", channel: AbstractChannel, queue_name: str):
+        # NOTE: One TTL queue per attempt keeps expirations in a queue close to each other,
+        # so per-message jitter barely suffers from RabbitMQ's head-of-line expiration
+        for attempt in range(1, self.max_attempts + 1):
+            await topology.queue(channel, RQControllerQueue(self.retry_queue_name(queue_name, attempt),
+                                                            durable=self.durable,
+                                                            arguments={
+                                                                "x-dead-letter-exchange": "",
+                                                                "x-dead-letter-routing-key": queue_name,
+                                                            }))
+
+        await topology.queue(channel, RQControllerQueue(self.parking_queue_name(queue_name), durable=self.durable))
@@ -1,11 +1,14 @@
+import json
 from logging import getLogger
 from time import time
 from typing import TYPE_CHECKING, Unpack
+from plugins.microservices.serialization.compression import CompressionPolicy
 from plugins.microservices.types.http_response import HTTPResponse
 from aiohttp import ClientResponse, ClientSession, ContentTypeError, TCPConnector
 from aiohttp.typedefs import StrOrURL
 from aiohttp.client import _RequestOptions
 from contextvars import ContextVar
+from multidict import CIMultiDict
 
 if TYPE_CHECKING:
     from plugins.microservices.waypoints.registry import WaypointRegistry
@@ -16,8 +19,10 @@ class WaypointContext:
     waypoint_registry: "WaypointRegistry"
 
     def __init__(self, shared_connector: TCPConnector | None, 
-                 waypoint_registry: "WaypointRegistry", **session_scope) -> None:
+                 waypoint_registry: "WaypointRegistry",
+                 compression: CompressionPolicy | None = None, **session_scope) -> None:
         self.shared_connector = shared_connector
+        self.compression = compression
         self.session = ContextVar("session", default=None)
         self.ssl = session_scope["ssl"]
         self.waypoint_registry = waypoint_registry
@@ -242,6 +247,9 @@ class WaypointContext:
         """
         NOTE: This is an internal method and is prohibited to use outside of `WaypointContext` object's scope
         """
+        if self.compression and kwargs.get("json") is not None:
+            kwargs = self._compress_body(**kwargs)
+
         # NOTE: If shared connector, where `keep_connection=True`
         if self.shared_connector:
             _response = await getattr(self.session, method)(url, **kwargs)
@@ -260,5 +268,17 @@ class WaypointContext:
 
         return _response
 
+    def _compress_body(self, **kwargs: Unpack[_RequestOptions]):
+        data = json.dumps(kwargs.pop("json")).encode("utf-8")
+        data, content_encoding = self.compression.compress(data)
+
+        # NOTE: `LooseHeaders` may be a mapping or sequence of pairs, caller's `Content-Type` is kept
+        headers = CIMultiDict(kwargs.get("headers") or {})
+        headers.setdefault("Content-Type", "application/json")
+        if content_encoding:
+            headers["Content-Encoding"] = content_encoding
+
+        return {**kwargs, "data": data, "headers": headers}
+
     def update_response(self, response: HTTPResponse):
         self._response.set(response)
\ No newline at end of file